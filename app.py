@@ -1,43 +1,131 @@
 # app.py
 
+import time
+from typing import List, Tuple
+
 import streamlit as st
-from dean_data import KNOWLEDGE_BASE, TOTAL_FAQS, CATEGORIES
-from dean_logic import process_query
+from dean_cache import QueryCache, query_key
+from dean_data import CATEGORIES, FAQEntry
+from dean_index import KnowledgeIndex, normalize_categories
+from dean_logic import NO_MATCH_ANSWER, browse_faqs, get_index, suggest, tokenize
+from dean_metrics import METRICS
+from dean_reload import KnowledgeReloader
+
+_rerun_start = time.perf_counter()
+
+# -------------------------
+# Shared resources and per-session caches
+# -------------------------
+
+@st.cache_resource(show_spinner="Loading the knowledge base...")
+def start_engine() -> KnowledgeReloader:
+    """
+    Build the compiled knowledge base, synonym maps and index once per
+    process (shared by all sessions) and watch the source for changes.
+    """
+    get_index()
+    return KnowledgeReloader().start()
+
+def load_engine() -> KnowledgeIndex:
+    """The index currently serving (swapped in place by the reloader)."""
+    start_engine()
+    return get_index()
+
+def search(query: str, categories: List[str], k: int = 4) -> List[Tuple[FAQEntry, int]]:
+    """Ranked results for this session, cached per normalized query."""
+    if "results" not in st.session_state:
+        st.session_state["results"] = QueryCache(maxsize=64)
+    results: QueryCache = st.session_state["results"]
+    engine = load_engine()
+    toks = tokenize(query)
+    key = (query_key(toks, normalize_categories(categories or None), engine.phrase_hits(toks)), k, engine.generation)
+    ranked = results.get(key)
+    if ranked is None:
+        ranked = engine.topk(toks, k, categories or None)
+        results.put(key, ranked)
+    return ranked
 
 st.set_page_config(page_title="Dean's Office FAQ", page_icon="📘", layout="centered")
 
+engine = load_engine()
+
 st.title("Dean's Office FAQ System")
 st.caption("Type your question and get the best matching answer. Powered by your Isabelle logic, ported to Python.")
 
 # Sidebar: filters and info
 with st.sidebar:
     st.header("Filters")
-    category = st.selectbox("Category (optional)", options=["All"] + CATEGORIES, index=0)
+    categories = st.multiselect("Categories (optional)", options=CATEGORIES, default=[])
     st.markdown("---")
-    st.metric(label="Total FAQs", value=TOTAL_FAQS)
+    st.metric(label="Total FAQs", value=len(engine.entries))
     st.markdown("Use categories to narrow results.")
 
+def pick_suggestion(text: str) -> None:
+    """Fill the query box with a suggestion and search for it."""
+    st.session_state["query"] = text
+    st.session_state["run_search"] = True
+
 # Main query input
-query = st.text_input("Ask a question", placeholder="e.g., GPA requirement to graduate, how to get a transcript, registration dates")
+query = st.text_input("Ask a question", key="query",
+                      placeholder="e.g., GPA requirement to graduate, how to get a transcript, registration dates")
 
-if st.button("Search"):
-    cat_filter = None if category == "All" else category
-    answer, best = process_query(query, category_filter=cat_filter)
+# Completions of the text so far (from the prefix trie). st.text_input
+# only reruns the script on Enter or when the box loses focus, so they
+# refresh then, not on every keystroke.
+suggestions = [s for s in suggest(query) if s != query] if query.strip() else []
+if suggestions:
+    st.caption("Suggestions (updated when you press Enter or leave the box)")
+    for i, text in enumerate(suggestions):
+        st.button(text, key=f"suggestion_{i}", on_click=pick_suggestion, args=(text,))
+
+if st.button("Search") or st.session_state.pop("run_search", False):
+    # One ranked pass gives both the best match and the related questions
+    ranked = search(query, categories)
 
     # Show result
-    if best:
+    if ranked:
+        best = ranked[0][0]
         st.subheader("Best match")
         st.write(f"• Category: {best.cat}")
         st.write(f"• Question: {best.question}")
-        st.success(answer)
+        st.success(best.answer)
+
+        related = [f for f, sc in ranked[1:] if sc > 0]
+        if related:
+            st.markdown("**Related questions**")
+            for f in related:
+                st.write(f"• {f.question}")
     else:
-        st.warning(answer)
-
-# Expandable list of all FAQs
-with st.expander("Browse all FAQs"):
-    for f in KNOWLEDGE_BASE:
-        st.markdown(f"**Category:** {f.cat}")
-        st.markdown(f"**Question:** {f.question}")
-        st.markdown(f"**Answer:** {f.answer}")
-        st.markdown(f"**Keywords:** {', '.join(f.keywords)}")
-        st.markdown("---")
\ No newline at end of file
+        st.warning(NO_MATCH_ANSWER)
+
+# Browse all FAQs: paginated, only the visible page is rendered
+PAGE_SIZES = [10, 25, 50]
+
+if st.toggle("Browse all FAQs"):
+    col_cat, col_size = st.columns([3, 1])
+    browse_cat = col_cat.selectbox("Category", options=["All"] + CATEGORIES, index=0, key="browse_cat")
+    page_size = col_size.selectbox("Per page", options=PAGE_SIZES, index=0, key="browse_page_size")
+    browse_query = st.text_input("Search within FAQs", key="browse_query")
+
+    page = st.number_input("Page", min_value=1, value=1, step=1, key="browse_page")
+
+    cat_filter = None if browse_cat == "All" else browse_cat
+    entries, total = browse_faqs(int(page) - 1, page_size, cat_filter, browse_query)
+    pages = max(1, -(-total // page_size))
+    st.caption(f"{total} FAQs · page {int(page)} of {pages}")
+    current_cat = None
+    for f in entries:
+        if f.cat != current_cat:
+            current_cat = f.cat
+            st.subheader(current_cat)
+        st.markdown(
+            f"**Question:** {f.question}  \n"
+            f"**Answer:** {f.answer}  \n"
+            f"**Keywords:** {', '.join(f.keywords)}"
+        )
+        st.markdown("---")
+
+_rerun_seconds = time.perf_counter() - _rerun_start
+METRICS.observe("app", "rerun", _rerun_seconds)
+with st.sidebar:
+    st.caption(f"Rerun time: {_rerun_seconds * 1000:.1f} ms")
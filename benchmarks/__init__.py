@@ -0,0 +1 @@
+# benchmarks: run from the repository root, e.g. `python -m benchmarks.bench_synonyms`
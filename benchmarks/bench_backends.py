@@ -0,0 +1,52 @@
+# benchmarks/bench_backends.py
+#
+# process_query scoring backends side by side: the pure-Python reference
+# (find_best), the inverted index and the numpy matrix scorer. Every
+# backend must return the same entry for every query.
+#
+#   python -m benchmarks.bench_backends --entries 10000 --queries 500
+
+import argparse
+import time
+from dean_data import KNOWLEDGE_BASE, SYNONYMS
+from dean_index import KnowledgeIndex
+from dean_logic import find_best, tokenize
+from benchmarks.synthetic import make_knowledge_base, make_queries
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare process_query backends.")
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--entries", type=int, default=0, help="synthetic corpus size (0 = dean_data)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.entries:
+        entries, synonyms = make_knowledge_base(args.entries, args.seed)
+    else:
+        entries, synonyms = KNOWLEDGE_BASE, SYNONYMS
+    token_lists = [tokenize(q) for q in make_queries(entries, synonyms, args.queries, args.seed)]
+
+    backends = {
+        "python": lambda toks: find_best(entries, toks),
+        "index": KnowledgeIndex(entries, synonyms).best,
+    }
+    try:
+        from dean_numpy import MatrixScorer
+        backends["numpy"] = MatrixScorer(entries).best
+    except ImportError:
+        print("numpy not installed: skipping the numpy backend")
+
+    print(f"entries={len(entries)} queries={len(token_lists)}")
+    results = {}
+    for name, best in backends.items():
+        t0 = time.perf_counter()
+        results[name] = [best(toks) for toks in token_lists]
+        elapsed = time.perf_counter() - t0
+        print(f"{name:7s} {elapsed / len(token_lists) * 1e6:10.1f} us/query")
+
+    reference = results["python"]
+    for name, found in results.items():
+        assert all(a is b for a, b in zip(reference, found)), f"{name} disagrees with find_best"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/bench_batch.py
+#
+# Throughput of process_queries (batched) vs one process_query per line.
+#
+#   python -m benchmarks.bench_batch --queries 100000
+#   python -m benchmarks.bench_batch --queries 100000 --entries 10000
+
+import argparse
+import time
+from dean_data import KNOWLEDGE_BASE, SYNONYMS
+from dean_index import KnowledgeIndex
+from dean_logic import tokenize
+from benchmarks.synthetic import make_knowledge_base, make_queries
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Batch vs per-query throughput.")
+    ap.add_argument("--queries", type=int, default=100000)
+    ap.add_argument("--entries", type=int, default=0, help="synthetic corpus size (0 = dean_data)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    if args.entries:
+        entries, synonyms = make_knowledge_base(args.entries, args.seed)
+    else:
+        entries, synonyms = KNOWLEDGE_BASE, SYNONYMS
+    queries = make_queries(entries, synonyms, args.queries, args.seed)
+
+    # Fresh indexes so neither run profits from postings cached by the other.
+    t0 = time.perf_counter()
+    index = KnowledgeIndex(entries, synonyms)
+    single = [index.best(tokenize(q)) for q in queries]
+    t_single = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    index = KnowledgeIndex(entries, synonyms)
+    batch = index.best_many([tokenize(q) for q in queries])
+    t_batch = time.perf_counter() - t0
+
+    assert all(a is b for a, b in zip(single, batch)), "batch and per-query results differ"
+    print(f"entries={len(entries)} queries={len(queries)}")
+    print(f"per-query: {len(queries) / t_single:10.0f} queries/s")
+    print(f"batched:   {len(queries) / t_batch:10.0f} queries/s  ({t_single / t_batch:.1f}x)")
+
+if __name__ == "__main__":
+    main()
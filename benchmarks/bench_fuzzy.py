@@ -0,0 +1,67 @@
+# benchmarks/bench_fuzzy.py
+#
+# Cost of typo-tolerant matching (dean_fuzzy): best-match latency of the
+# index with fuzzy matching off and on, over a synthetic query log in
+# which some tokens are misspelled, and DeletionIndex lookup time per
+# token.
+#
+#   python -m benchmarks.bench_fuzzy --entries 10000 --typos 0.3
+
+import argparse
+import random
+import time
+from typing import List
+import dean_fuzzy
+from dean_index import KnowledgeIndex
+from dean_logic import tokenize
+from benchmarks.synthetic import make_knowledge_base, make_workload
+
+def misspell(word: str, rng: random.Random) -> str:
+    """One random edit: insert, delete, substitute or swap two adjacent letters."""
+    w = list(word)
+    i = rng.randrange(len(w))
+    op = rng.randrange(4)
+    if op == 0:
+        w.insert(i, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+    elif op == 1 and len(w) > 1:
+        del w[i]
+    elif op == 2:
+        w[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    elif i + 1 < len(w):
+        w[i], w[i + 1] = w[i + 1], w[i]
+    return "".join(w)
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure the cost of fuzzy matching.")
+    ap.add_argument("--entries", type=int, default=10000)
+    ap.add_argument("--queries", type=int, default=1000)
+    ap.add_argument("--typos", type=float, default=0.3, help="share of tokens misspelled")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    entries, synonyms = make_knowledge_base(args.entries, args.seed)
+    queries: List[List[str]] = [
+        [misspell(t, rng) if len(t) >= 4 and rng.random() < args.typos else t for t in tokenize(q)]
+        for q in make_workload(entries, synonyms, args.queries, seed=args.seed)
+    ]
+
+    max_distance = dean_fuzzy.FUZZY_MAX_DISTANCE
+    for label, distance in (("off", 0), ("on", max_distance)):
+        dean_fuzzy.configure(max_distance=distance)
+        index = KnowledgeIndex(entries, synonyms)
+        t0 = time.perf_counter()
+        for toks in queries:
+            index.best(toks)
+        elapsed = time.perf_counter() - t0
+        print(f"fuzzy {label:<3}: {elapsed / len(queries) * 1e6:8.0f} us/query")
+
+    words = index._all._fuzzy
+    toks = [t for q in queries for t in q]
+    t0 = time.perf_counter()
+    found = sum(len(words.lookup(t)) for t in toks)
+    elapsed = time.perf_counter() - t0
+    print(f"lookup:    {elapsed / len(toks) * 1e6:8.1f} us/token  ({found / len(toks):.2f} words/token)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_memory.py
+#
+# Memory per entry of a knowledge base loaded from JSON (as in production:
+# every string freshly decoded) and of the KnowledgeIndex built over it.
+#
+#   python -m benchmarks.bench_memory --entries 100000
+
+import argparse
+import gc
+import os
+import tempfile
+import tracemalloc
+from dean_index import KnowledgeIndex
+from dean_store import load_json, save_json
+from benchmarks.synthetic import CATEGORIES, make_knowledge_base
+
+def _traced(fn):
+    """(result, bytes still allocated by fn once it returns)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = fn()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure knowledge base and index memory per entry.")
+    ap.add_argument("--entries", type=int, default=100000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    entries, synonyms = make_knowledge_base(args.entries, args.seed)
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        save_json(path, entries, synonyms, CATEGORIES)
+        del entries
+        kb, kb_bytes = _traced(lambda: load_json(path))
+    finally:
+        os.remove(path)
+    _, index_bytes = _traced(lambda: KnowledgeIndex(kb.entries, kb.synonyms))
+
+    n = len(kb.entries)
+    print(f"entries={n}")
+    print(f"knowledge base: {kb_bytes / n:8.0f} bytes/entry  ({kb_bytes / 2**20:.1f} MiB)")
+    print(f"index:          {index_bytes / n:8.0f} bytes/entry  ({index_bytes / 2**20:.1f} MiB)")
+
+if __name__ == "__main__":
+    main()
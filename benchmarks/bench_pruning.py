@@ -0,0 +1,51 @@
+# benchmarks/bench_pruning.py
+#
+# Best-match search with and without upper-bound pruning
+# (PartitionIndex.pruned_scores) on a synthetic knowledge base and skewed
+# query log: latency, and the fraction of matching entries (non-zero
+# score) that were never fully scored. Results must agree exactly.
+#
+#   python -m benchmarks.bench_pruning --entries 10000 100000 --k 1 10
+
+import argparse
+import heapq
+import time
+from typing import List
+from dean_index import KnowledgeIndex, _rank
+from dean_logic import tokenize
+from benchmarks.synthetic import make_knowledge_base, make_workload
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure upper-bound pruning in the index.")
+    ap.add_argument("--entries", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--k", type=int, nargs="+", default=[1, 10])
+    ap.add_argument("--queries", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    for n in args.entries:
+        entries, synonyms = make_knowledge_base(n, args.seed)
+        part = KnowledgeIndex(entries, synonyms)._all
+        queries: List[List[str]] = [tokenize(q) for q in make_workload(entries, synonyms, args.queries, seed=args.seed)]
+        for k in args.k:
+            matched = scored = 0
+            t_full = t_pruned = 0.0
+            for toks in queries:
+                t0 = time.perf_counter()
+                full = part.score(toks)
+                expected = heapq.nsmallest(k, full.items(), key=_rank)
+                t1 = time.perf_counter()
+                pruned = part.pruned_scores(toks, k)
+                got = heapq.nsmallest(k, pruned.items(), key=_rank)
+                t_pruned += time.perf_counter() - t1
+                t_full += t1 - t0
+                assert got == expected, "pruned search disagrees with full scoring"
+                matched += len(full)
+                scored += len(pruned)
+            print(f"entries={n:<7} k={k:<3} matching={matched / len(queries):8.0f}/query  "
+                  f"skipped={1 - scored / max(matched, 1):6.1%}  "
+                  f"full={t_full / len(queries) * 1e6:8.0f} us/query  "
+                  f"pruned={t_pruned / len(queries) * 1e6:8.0f} us/query  ({t_full / t_pruned:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# benchmarks/bench_querylog.py
+#
+# Throughput of the query-log pipeline (dean_querylog) in lines/s on a
+# synthetic JSONL log over dean_data: skewed query frequencies, some
+# category filters and a few malformed lines, for several worker counts.
+#
+#   python -m benchmarks.bench_querylog --lines 200000 --workers 1 2 4
+
+import argparse
+import json
+import os
+import random
+import tempfile
+from dean_data import CATEGORIES, KNOWLEDGE_BASE, SYNONYMS
+from dean_querylog import analyze
+from benchmarks.synthetic import make_workload
+
+def write_log(path: str, n_lines: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as fh:
+        for q in make_workload(KNOWLEDGE_BASE, SYNONYMS, n_lines, seed=seed):
+            r = rng.random()
+            if r < 0.001:
+                fh.write("{not json\n")
+                continue
+            record = {"q": q}
+            if r < 0.2:
+                record["category"] = rng.choice(CATEGORIES)
+            fh.write(json.dumps(record) + "\n")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure query-log pipeline throughput.")
+    ap.add_argument("--lines", type=int, default=200000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".jsonl")
+    os.close(fd)
+    try:
+        write_log(path, args.lines, args.seed)
+        print(f"log: {args.lines} lines, {os.path.getsize(path) / 2**20:.1f} MiB, cpus={os.cpu_count()}")
+        baseline = None
+        for workers in args.workers:
+            summary = analyze([path], workers=workers)
+            report = summary.report()
+            report.pop("seconds")
+            report.pop("lines_per_second")
+            same = "" if baseline is None else ("  same report" if report == baseline else "  REPORT DIFFERS")
+            baseline = baseline or report
+            print(f"workers={workers}: {summary.lines_per_second():9.0f} lines/s  "
+                  f"({summary.queries} queries, {summary.malformed} malformed){same}")
+    finally:
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# benchmarks/bench_suggest.py
+#
+# Type-ahead suggestions (dean_suggest) on synthetic knowledge bases:
+# build time, trie size (nodes, bytes, bytes per completion) and lookup
+# latency of SuggestionTrie.suggest over prefixes of real completions,
+# as typed one character at a time.
+#
+#   python -m benchmarks.bench_suggest --entries 10000 100000
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from dean_data import compile_synonyms
+from dean_suggest import SuggestionTrie
+from benchmarks.synthetic import make_knowledge_base
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure suggestion trie size and lookup latency.")
+    ap.add_argument("--entries", type=int, nargs="+", default=[10000, 100000])
+    ap.add_argument("--prefixes", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    for n_entries in args.entries:
+        entries, synonyms = make_knowledge_base(n_entries, args.seed)
+        synonym_sets, _ = compile_synonyms(synonyms)
+
+        t0 = time.perf_counter()
+        SuggestionTrie.from_entries(entries, synonym_sets)
+        build = time.perf_counter() - t0
+
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        trie = SuggestionTrie.from_entries(entries, synonym_sets)
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        rng = random.Random(args.seed)
+        prefixes = []
+        while len(prefixes) < args.prefixes:
+            text = rng.choice(trie.texts)
+            prefixes.extend(text[:i] for i in range(1, len(text) + 1))
+        prefixes = prefixes[:args.prefixes]
+
+        timings = []
+        for p in prefixes:
+            t0 = time.perf_counter()
+            trie.suggest(p)
+            timings.append(time.perf_counter() - t0)
+        timings.sort()
+        p50 = timings[len(timings) // 2] * 1e6
+        p99 = timings[int(len(timings) * 0.99)] * 1e6
+
+        print(f"entries={len(entries):<7} completions={len(trie):<7} nodes={trie.nodes:<7} "
+              f"build={build:6.2f} s")
+        print(f"  trie:    {trie.memory_bytes() / 2**20:7.1f} MiB  "
+              f"({trie.memory_bytes() / len(trie):5.0f} bytes/completion, texts shared with the entries)")
+        print(f"  traced:  {traced / 2**20:7.1f} MiB  ({traced / len(trie):5.0f} bytes/completion)")
+        print(f"  suggest: p50={p50:6.1f} us  p99={p99:6.1f} us  over {len(prefixes)} prefixes")
+
+if __name__ == "__main__":
+    main()
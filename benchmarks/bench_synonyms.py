@@ -0,0 +1,76 @@
+# benchmarks/bench_synonyms.py
+#
+# Old (list-scan synonyms, re-tokenize per entry) vs new (precompiled
+# features, frozenset synonyms) scorer on a synthetic knowledge base.
+# The new scorer also scores phrases and typos, which the old one never
+# did: agreement is checked with typo matching off, on the queries
+# without a phrase hit.
+#
+#   python -m benchmarks.bench_synonyms --entries 10000 --queries 200
+
+import argparse
+import re
+import time
+from typing import Dict, List, Optional
+import dean_fuzzy
+from dean_data import FAQEntry
+from dean_logic import count_phrase, entry_features, find_best, tokenize
+from benchmarks.synthetic import make_knowledge_base, make_queries
+
+# -------------------------
+# Old scorer (as shipped before the compiled synonym maps)
+# -------------------------
+
+def legacy_find_best(faqs: List[FAQEntry], toks: List[str], synonyms: Dict[str, List[str]]) -> Optional[FAQEntry]:
+    def hit(tok: str, kw: str) -> int:
+        if tok == kw:
+            return 3
+        if tok in synonyms.get(kw, []):
+            return 2
+        if kw in tok or tok in kw:
+            return 1
+        return 0
+
+    best, best_score = None, -1
+    for f in faqs:
+        ks = [k.lower() for k in f.keywords]
+        sc = sum(hit(tok, kw) for kw in ks for tok in toks)
+        q_tokens = [t.lower() for t in re.split(r"[^A-Za-z0-9]+", f.question) if t]
+        sc += sum(1 for t in q_tokens if t in toks)
+        if sc > best_score:
+            best, best_score = f, sc
+    return best
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare the old and new scorers.")
+    ap.add_argument("--entries", type=int, default=10000)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    entries, synonyms = make_knowledge_base(args.entries, args.seed)
+    queries = [tokenize(q) for q in make_queries(entries, synonyms, args.queries, args.seed)]
+
+    t0 = time.perf_counter()
+    old = [legacy_find_best(entries, toks, synonyms) for toks in queries]
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [find_best(entries, toks) for toks in queries]
+    t_new = time.perf_counter() - t0
+
+    phrases = {seq for f in entries for seq, _ in entry_features(f).phrases}
+    plain = [i for i, toks in enumerate(queries) if not any(count_phrase(seq, toks) for seq in phrases)]
+    max_distance = dean_fuzzy.FUZZY_MAX_DISTANCE
+    dean_fuzzy.configure(max_distance=0)
+    try:
+        agree = all(old[i] is find_best(entries, queries[i]) for i in plain)
+    finally:
+        dean_fuzzy.configure(max_distance=max_distance)
+    assert agree, "scorers disagree"
+    print(f"entries={args.entries} queries={args.queries} (agreement checked on {len(plain)} without phrase hits)")
+    print(f"old scorer: {t_old / len(queries) * 1000:8.2f} ms/query")
+    print(f"new scorer: {t_new / len(queries) * 1000:8.2f} ms/query  ({t_old / t_new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
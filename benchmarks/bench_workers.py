@@ -0,0 +1,93 @@
+# benchmarks/bench_workers.py
+#
+# Pre-fork scaling of dean_server: for 1, 2, 4 and 8 workers, aggregate
+# QPS under load and the memory of every worker. The knowledge base is
+# a synthetic snapshot loaded once by the parent before it forks.
+# RSS counts shared pages in every worker; PSS splits them between the
+# processes sharing them, and "private" is what a worker owns alone, so
+# private (not RSS) is the cost of one more worker.
+#
+#   python -m benchmarks.bench_workers --entries 20000 --requests 20000
+#   python -m benchmarks.bench_workers --workers 1 2 4 8 --json workers.json
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+from dean_data import CATEGORIES
+from dean_store import write_snapshot
+from benchmarks.load_server import free_port, run_load, start_server
+from benchmarks.synthetic import make_knowledge_base, make_queries
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """RSS / PSS / private memory of a process in kB (Linux /proc)."""
+    fields = {"Rss": 0, "Pss": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    with open(f"/proc/{pid}/smaps_rollup") as fh:
+        for line in fh:
+            name, _, rest = line.partition(":")
+            if name in fields:
+                fields[name] = int(rest.split()[0])
+    return {"rss_kb": fields["Rss"], "pss_kb": fields["Pss"],
+            "private_kb": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+def worker_pids(parent: int) -> List[int]:
+    with open(f"/proc/{parent}/task/{parent}/children") as fh:
+        return [int(p) for p in fh.read().split()]
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Pre-fork worker scaling: QPS and memory.")
+    ap.add_argument("--entries", type=int, default=20000)
+    ap.add_argument("--requests", type=int, default=20000)
+    ap.add_argument("--connections", type=int, default=8, help="per worker")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="also write the results here")
+    args = ap.parse_args()
+
+    entries, synonyms = make_knowledge_base(args.entries, args.seed)
+    queries = make_queries(entries, synonyms, 2000, args.seed)
+    print(f"entries={len(entries)} requests={args.requests} cpus={os.cpu_count()}")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "bench.kbsnap")
+        write_snapshot(snapshot, entries, synonyms, CATEGORIES)
+        env = dict(os.environ, DEANS_FAQ_KB=snapshot)
+        for n in args.workers:
+            port = free_port()
+            proc = start_server(port, ["--workers", str(n), "--pool-size", "1"], env)
+            try:
+                # Warm-up pass so every worker has touched its caches
+                asyncio.run(run_load("127.0.0.1", port, "query", 500, n * 2, args.seed, queries))
+                load = asyncio.run(run_load("127.0.0.1", port, "query", args.requests,
+                                            n * args.connections, args.seed, queries))
+                time.sleep(0.2)
+                mem = [memory_kb(pid) for pid in worker_pids(proc.pid)]
+                parent = memory_kb(proc.pid)
+            finally:
+                proc.terminate()
+                proc.wait()
+            row = {
+                "workers": n, **load,
+                "parent_rss_kb": parent["rss_kb"],
+                "worker_rss_kb": round(sum(m["rss_kb"] for m in mem) / len(mem)),
+                "worker_pss_kb": round(sum(m["pss_kb"] for m in mem) / len(mem)),
+                "worker_private_kb": round(sum(m["private_kb"] for m in mem) / len(mem)),
+                "total_pss_kb": parent["pss_kb"] + sum(m["pss_kb"] for m in mem),
+            }
+            results.append(row)
+
+    print(f"{'workers':>7} {'qps':>9} {'p50 ms':>8} {'p99 ms':>8} {'rss/worker':>11} "
+          f"{'pss/worker':>11} {'private/worker':>15} {'total pss':>10}")
+    for r in results:
+        print(f"{r['workers']:7d} {r['qps']:9.0f} {r['p50_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['worker_rss_kb'] / 1024:9.1f}MB {r['worker_pss_kb'] / 1024:9.1f}MB "
+              f"{r['worker_private_kb'] / 1024:13.1f}MB {r['total_pss_kb'] / 1024:8.1f}MB")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/check_incremental.py
+#
+# Randomized check of KnowledgeIndex.add/update/remove/compact: after
+# every batch of edits, best() and topk() must agree with an index built
+# from scratch over the live entries (and category filters must too).
+# Some query tokens are misspelled, so fuzzy hits are patched as well.
+# --entries 0 edits the live dean_data KNOWLEDGE_BASE index through
+# dean_logic.add_entry/update_entry/remove_entry instead of a synthetic
+# corpus, and also checks process_query against find_best.
+# Finally, compaction is run in the middle of queries (after they read
+# their posting lists, or after they picked their ids): they must not
+# return the purged entries.
+#
+#   python -m benchmarks.check_incremental
+#   python -m benchmarks.check_incremental --entries 0
+#   python -m benchmarks.check_incremental --entries 2000 --rounds 200 --seed 3
+
+import argparse
+import random
+from typing import Callable, Dict, List
+import dean_data
+import dean_logic
+from dean_data import FAQEntry
+from dean_index import KnowledgeIndex, normalize_categories
+from dean_logic import find_best, tokenize
+from benchmarks.bench_fuzzy import misspell
+from benchmarks.synthetic import make_knowledge_base, make_queries
+
+def _fresh(rng: random.Random, pool: List[FAQEntry], categories: List[str]) -> FAQEntry:
+    # A new object (identity matters for the comparison), sometimes in a new category
+    f = rng.choice(pool)
+    cat = f.cat if rng.random() < 0.9 else rng.choice(categories)
+    return f.replace(cat=cat)
+
+def _compaction_races(index: KnowledgeIndex, remove: Callable, compact: Callable,
+                      live: Dict[int, FAQEntry], rng: random.Random, n: int) -> int:
+    """Interleave compact() with running queries; returns the number of bad results."""
+    queries = {
+        "matching": lambda toks: [index._slots[eid] for eid, _ in index.matching(toks)],
+        "topk": lambda toks: [f for f, _ in index.topk(toks, 5)],
+        "best": lambda toks: [index.best(toks)],
+        "best_many": lambda toks: index.best_many([toks]),
+    }
+    mismatches = 0
+    for i in range(n):
+        for name, query in queries.items():
+            if len(live) < 2:
+                return mismatches
+            eid = rng.choice(sorted(live))
+            f = live.pop(eid)
+            toks = tokenize(f.question)
+            remove(eid)
+            if eid not in index._dead:
+                continue  # compacted right away
+            pending = [True]
+
+            def then_compact(method):
+                def wrapped(*args):
+                    result = method(*args)
+                    if pending:
+                        pending.pop()
+                        compact()
+                    return result
+                return wrapped
+
+            if i % 2 == 0:
+                # The query holds posting lists (or impact layers) from before the purge
+                parts = [index._all, *index._partitions.values()]
+                for part in parts:
+                    part.postings = then_compact(part.postings)
+                    part._impact_layers = then_compact(part._impact_layers)
+            else:
+                # The query has picked its ids; its best one is removed and purged
+                parts = []
+                found = index.top
+
+                def top(*args):
+                    result = found(*args)
+                    if pending and result and result[0][0] in live:
+                        live.pop(result[0][0])
+                        remove(result[0][0])
+                    return result
+                index.top = then_compact(top)
+            try:
+                got = query(toks)
+            finally:
+                for part in parts:
+                    del part.postings, part._impact_layers
+                index.__dict__.pop("top", None)
+            if any(g is None or g is f for g in got):
+                print(f"compaction during {name}({toks}): {[g and g.question for g in got][:5]}")
+                mismatches += 1
+    return mismatches
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Incremental index updates vs a full rebuild.")
+    ap.add_argument("--entries", type=int, default=600, help="0: the dean_data knowledge base")
+    ap.add_argument("--rounds", type=int, default=100)
+    ap.add_argument("--queries", type=int, default=40, help="queries checked per round")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.entries == 0:
+        # The live index over KNOWLEDGE_BASE, edited through dean_logic
+        pool, synonyms = list(dean_data.KNOWLEDGE_BASE), dean_data.SYNONYMS
+        index = dean_logic.reload_knowledge_base()
+        add, update, remove = dean_logic.add_entry, dean_logic.update_entry, dean_logic.remove_entry
+        compact = dean_logic.compact_index
+    else:
+        pool, synonyms = make_knowledge_base(args.entries, args.seed)
+        half = len(pool) // 2
+        index = KnowledgeIndex([f.replace() for f in pool[:half]], synonyms)
+        add, update, remove, compact = index.add, index.update, index.remove, index.compact
+    categories = sorted({f.cat for f in pool}) + ["new_category"]
+    queries = make_queries(pool, synonyms, args.rounds * args.queries, args.seed)
+    index.COMPACT_MIN = 16
+    live = {eid: f for eid, f in enumerate(index.entries)}
+
+    counts = {"add": 0, "update": 0, "remove": 0, "compact": 0}
+    mismatches = 0
+    for r in range(args.rounds):
+        for _ in range(rng.randint(1, 8)):
+            op = rng.random()
+            if op < 0.4 or not live:
+                f = _fresh(rng, pool, categories)
+                live[add(f)] = f
+                counts["add"] += 1
+            elif op < 0.7:
+                eid = rng.choice(sorted(live))
+                f = _fresh(rng, pool, categories)
+                update(eid, f)
+                live[eid] = f
+                counts["update"] += 1
+            elif op < 0.97:
+                eid = rng.choice(sorted(live))
+                remove(eid)
+                del live[eid]
+                counts["remove"] += 1
+            else:
+                compact()
+                counts["compact"] += 1
+
+        expected_entries = [live[eid] for eid in sorted(live)]
+        if index.entries != expected_entries or any(a is not b for a, b in zip(index.entries, expected_entries)):
+            print(f"round {r}: live entries differ")
+            mismatches += 1
+        ref = KnowledgeIndex(expected_entries, synonyms)
+        for q in queries[r * args.queries:(r + 1) * args.queries]:
+            toks = [misspell(t, rng) if len(t) >= 4 and rng.random() < 0.2 else t for t in tokenize(q)]
+            cf = rng.choice([None, None, rng.choice(categories), rng.sample(categories, 2)])
+            got = [(f.question, sc) for f, sc in index.topk(toks, 5, cf)]
+            want = [(f.question, sc) for f, sc in ref.topk(toks, 5, cf)]
+            if got != want or index.best(toks, cf) is not ref.best(toks, cf):
+                print(f"round {r}: {q!r} filter={cf}\n  incremental {got}\n  rebuilt     {want}")
+                mismatches += 1
+            if args.entries == 0:
+                # Through the query cache, which every edit must invalidate
+                cats = normalize_categories(cf)
+                expected = find_best([f for f in expected_entries if cats is None or f.cat in cats], toks)
+                if dean_logic.process_query(" ".join(toks), cf)[1] is not expected:
+                    print(f"round {r}: process_query({' '.join(toks)!r}, {cf}) differs from find_best")
+                    mismatches += 1
+
+    mismatches += _compaction_races(index, remove, compact, live, rng, 10)
+    print(f"live={len(live)} ops={counts} tombstones={len(index._dead)}")
+    print(f"mismatches {mismatches}")
+    raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/load_server.py
+#
+# Local load test for dean_server: keep-alive connections send queries
+# drawn from a synthetic query log and report throughput and latency.
+# Without --url a server is started in a subprocess on a free port.
+#
+#   python -m benchmarks.load_server --connections 32 --requests 20000
+#   python -m benchmarks.load_server --pool process --pool-size 4
+#   python -m benchmarks.load_server --url http://127.0.0.1:8080 --endpoint topk
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+from dean_data import KNOWLEDGE_BASE, SYNONYMS
+from benchmarks.synthetic import make_queries
+
+async def _get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str) -> Tuple[int, bytes]:
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    return status, await reader.readexactly(length)
+
+async def _client(host: str, port: int, paths: List[str], latencies: List[float], errors: List[int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            t0 = time.perf_counter()
+            status, body = await _get(reader, writer, host, path)
+            latencies.append(time.perf_counter() - t0)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+def _paths(endpoint: str, n: int, seed: int, queries: Optional[List[str]] = None) -> List[str]:
+    queries = queries or make_queries(KNOWLEDGE_BASE, SYNONYMS, n, seed)
+    if endpoint == "topk":
+        return [f"/topk?k=5&q={quote(q)}" for q in queries]
+    if endpoint == "faqs":
+        return [f"/faqs?page={i % 4}&page_size=10" for i in range(n)]
+    return [f"/query?q={quote(q)}" for q in queries]
+
+async def run_load(host: str, port: int, endpoint: str, requests: int, connections: int, seed: int = 0,
+                   queries: Optional[List[str]] = None) -> dict:
+    """
+    Send requests over connections keep-alive connections; returns the
+    measurements. queries: the query texts to cycle through (default: a
+    synthetic log over dean_data).
+    """
+    if queries:
+        queries = [queries[i % len(queries)] for i in range(requests)]
+    paths = _paths(endpoint, requests, seed, queries)
+    latencies: List[float] = []
+    errors: List[int] = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, paths[i::connections], latencies, errors) for i in range(connections)
+    ))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    return {"requests": len(latencies), "errors": len(errors), "seconds": round(elapsed, 3),
+            "qps": round(len(latencies) / elapsed, 1), "p50_ms": round(pct(0.50), 3),
+            "p99_ms": round(pct(0.99), 3)}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(port: int, extra: List[str], env: Optional[dict] = None) -> subprocess.Popen:
+    """dean_server in a subprocess; returns once it accepts connections."""
+    proc = subprocess.Popen([sys.executable, "dean_server.py", "--port", str(port)] + extra, env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("server exited during start-up")
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Load-test the FAQ HTTP API.")
+    ap.add_argument("--url", help="running server (default: start one)")
+    ap.add_argument("--endpoint", choices=("query", "topk", "faqs"), default="query")
+    ap.add_argument("--requests", type=int, default=10000)
+    ap.add_argument("--connections", type=int, default=16)
+    ap.add_argument("--pool", choices=("thread", "process"), default="thread")
+    ap.add_argument("--pool-size", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = "127.0.0.1", free_port()
+        proc = start_server(port, ["--pool", args.pool, "--pool-size", str(args.pool_size)])
+    try:
+        result = asyncio.run(run_load(host, port, args.endpoint, args.requests, args.connections, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    print(json.dumps(result))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/run.py
+#
+# Benchmark suite for the query path. For every corpus size and engine:
+# build time, p50/p99 latency, throughput and peak traced memory, on a
+# synthetic knowledge base (benchmarks.synthetic) and a skewed query log.
+# Results go to a JSON file that --compare diffs across commits.
+#
+#   python -m benchmarks.run                                 # 100 .. 100k entries
+#   python -m benchmarks.run --sizes 1000 10000 --engines index numpy -o after.json
+#   python -m benchmarks.run --compare before.json after.json
+
+import argparse
+import datetime
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Sequence
+from dean_data import FAQEntry
+from dean_index import KnowledgeIndex
+import dean_logic
+from dean_logic import find_best, tokenize
+from dean_numpy import MatrixScorer  # raises ImportError only when used without numpy
+from benchmarks.synthetic import make_knowledge_base, make_workload
+
+# -------------------------
+# Engines: name -> factory(entries, synonyms) -> function(query text) -> entry
+# -------------------------
+
+def _python(entries: List[FAQEntry], synonyms: Dict[str, List[str]]) -> Callable[[str], Optional[FAQEntry]]:
+    return lambda q: find_best(entries, tokenize(q))
+
+def _index(entries: List[FAQEntry], synonyms: Dict[str, List[str]]) -> Callable[[str], Optional[FAQEntry]]:
+    index = KnowledgeIndex(entries, synonyms)
+    return lambda q: index.best(tokenize(q))
+
+def _process_query(entries: List[FAQEntry], synonyms: Dict[str, List[str]]) -> Callable[[str], Optional[FAQEntry]]:
+    # The public entry point: index + query cache
+    dean_logic.install_index(KnowledgeIndex(entries, synonyms))
+    return lambda q: dean_logic.process_query(q)[1]
+
+def _numpy(entries: List[FAQEntry], synonyms: Dict[str, List[str]]) -> Callable[[str], Optional[FAQEntry]]:
+    scorer = MatrixScorer(entries)
+    return lambda q: scorer.best(tokenize(q))
+
+ENGINES: Dict[str, Callable[[List[FAQEntry], Dict[str, List[str]]], Callable[[str], Optional[FAQEntry]]]] = {
+    "python": _python,
+    "index": _index,
+    "process_query": _process_query,
+    "numpy": _numpy,
+}
+
+# -------------------------
+# Measurement
+# -------------------------
+
+def _percentile(sorted_values: Sequence[float], p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+def measure(factory, entries, synonyms, queries: List[str], budget: float, memory: bool) -> Dict[str, object]:
+    """One engine on one corpus: run queries until they are done or budget seconds have passed."""
+    gc.collect()
+    t0 = time.perf_counter()
+    best = factory(entries, synonyms)
+    build_s = time.perf_counter() - t0
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for q in queries:
+        t = time.perf_counter()
+        best(q)
+        latencies.append(time.perf_counter() - t)
+        if t - start > budget:
+            break
+    total = time.perf_counter() - start
+    latencies.sort()
+    result: Dict[str, object] = {
+        "build_ms": round(build_s * 1000, 3),
+        "queries": len(latencies),
+        "p50_us": round(_percentile(latencies, 0.50) * 1e6, 2),
+        "p99_us": round(_percentile(latencies, 0.99) * 1e6, 2),
+        "mean_us": round(total / len(latencies) * 1e6, 2),
+        "qps": round(len(latencies) / total, 1),
+    }
+    del best
+    if memory:
+        # Separate pass: tracing slows everything down, so it is not timed
+        gc.collect()
+        tracemalloc.start()
+        best = factory(entries, synonyms)
+        for q in queries[:min(len(latencies), 200)]:
+            best(q)
+        result["peak_mem_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        del best
+    return result
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes: List[int], engines: List[str], n_queries: int, budget: float, seed: int,
+        memory: bool = True, python_max: int = 10000) -> Dict[str, object]:
+    results = []
+    for n in sizes:
+        entries, synonyms = make_knowledge_base(n, seed)
+        queries = make_workload(entries, synonyms, n_queries, seed=seed)
+        for name in engines:
+            if name == "python" and n > python_max:
+                continue
+            try:
+                row = measure(ENGINES[name], entries, synonyms, queries, budget, memory)
+            except ImportError as exc:  # e.g. numpy not installed
+                print(f"skipping {name}: {exc}", file=sys.stderr)
+                continue
+            row = {"entries": n, "engine": name, **row}
+            results.append(row)
+            peak = f"{row['peak_mem_kb'] / 1024:7.1f} MB" if "peak_mem_kb" in row else "      -"
+            print(f"{n:>7} {name:<14} build {row['build_ms']:>10.1f} ms  p50 {row['p50_us']:>10.1f} us  "
+                  f"p99 {row['p99_us']:>10.1f} us  {row['qps']:>9.0f} q/s  peak {peak}", flush=True)
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"queries": n_queries, "budget_s": budget, "seed": seed},
+        "results": results,
+    }
+
+# -------------------------
+# Comparison of two result files
+# -------------------------
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as fh:
+        before = json.load(fh)
+    with open(after_path) as fh:
+        after = json.load(fh)
+    old = {(r["entries"], r["engine"]): r for r in before["results"]}
+    print(f"{before.get('commit')} -> {after.get('commit')}   (ratio = after / before; < 1 is faster/smaller)")
+    print(f"{'entries':>7} {'engine':<14} {'p50':>7} {'p99':>7} {'qps':>7} {'build':>7} {'memory':>7}")
+    for r in after["results"]:
+        b = old.get((r["entries"], r["engine"]))
+        if b is None:
+            continue
+        ratio = lambda k: f"{r[k] / b[k]:7.2f}" if b.get(k) and k in r else "      -"
+        print(f"{r['entries']:>7} {r['engine']:<14} {ratio('p50_us')} {ratio('p99_us')} "
+              f"{ratio('qps')} {ratio('build_ms')} {ratio('peak_mem_kb')}")
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Query-path benchmark suite.")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    ap.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    ap.add_argument("--queries", type=int, default=2000, help="query log length per run")
+    ap.add_argument("--budget", type=float, default=10.0, help="max seconds of queries per engine and size")
+    ap.add_argument("--python-max", type=int, default=10000,
+                    help="largest corpus for the pure-Python reference engine")
+    ap.add_argument("--no-memory", action="store_true", help="skip the traced-memory pass")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--out", default="benchmark_results.json")
+    ap.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = ap.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args.sizes, args.engines, args.queries, args.budget, args.seed,
+                 not args.no_memory, args.python_max)
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"wrote {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/synthetic.py
+
+import random
+import string
+from typing import Dict, List, Optional, Tuple
+from dean_data import CATEGORIES, FAQEntry, KNOWLEDGE_BASE, SYNONYMS, compile_knowledge_base
+
+# -------------------------
+# Synthetic corpus modelled on dean_data
+# - 3-5 keywords per entry, question of 4-9 words, 9 categories
+# - the real keywords and synonyms are part of the vocabulary
+# - word frequencies are skewed (a few words are very common)
+# -------------------------
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+
+def make_vocabulary(n_words: int, seed: int = 0) -> List[str]:
+    """Real dean_data keywords followed by random lowercase words."""
+    rng = random.Random(seed)
+    words: List[str] = []
+    seen = set()
+    for f in KNOWLEDGE_BASE:
+        for kw in f.keywords:
+            if kw.lower() not in seen:
+                seen.add(kw.lower())
+                words.append(kw.lower())
+    while len(words) < n_words:
+        w = _word(rng)
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words
+
+def _skewed_choice(rng: random.Random, words: List[str]) -> str:
+    # Roughly Zipfian: low indexes are picked far more often.
+    return words[min(int(rng.paretovariate(1.1)) - 1, len(words) - 1)]
+
+def make_synonyms(vocabulary: List[str], n_keys: int, seed: int = 0) -> Dict[str, List[str]]:
+    """The real SYNONYMS plus n_keys random keyword -> 2-4 synonym lists."""
+    rng = random.Random(seed + 1)
+    synonyms = {k: list(v) for k, v in SYNONYMS.items()}
+    keys = rng.sample(vocabulary, min(n_keys, len(vocabulary)))
+    for k in keys:
+        if k not in synonyms:
+            synonyms[k] = [_word(rng) for _ in range(rng.randint(2, 4))]
+    return synonyms
+
+def make_knowledge_base(n_entries: int, seed: int = 0,
+                        vocabulary: Optional[List[str]] = None) -> Tuple[List[FAQEntry], Dict[str, List[str]]]:
+    """Return (entries, synonyms); entries already carry compiled features."""
+    rng = random.Random(seed)
+    vocab = vocabulary or make_vocabulary(max(200, n_entries // 2), seed)
+    synonyms = make_synonyms(vocab, max(10, len(vocab) // 20), seed)
+    entries: List[FAQEntry] = []
+    for i in range(n_entries):
+        kws = list(dict.fromkeys(_skewed_choice(rng, vocab) for _ in range(rng.randint(3, 5))))
+        words = [_skewed_choice(rng, vocab) for _ in range(rng.randint(4, 9))]
+        entries.append(FAQEntry(
+            question=" ".join(words).capitalize() + "?",
+            answer=f"Synthetic answer {i}.",
+            keywords=kws,
+            cat=rng.choice(CATEGORIES),
+        ))
+    compile_knowledge_base(entries, synonyms)
+    return entries, synonyms
+
+def make_queries(entries: List[FAQEntry], synonyms: Dict[str, List[str]],
+                 n_queries: int, seed: int = 0) -> List[str]:
+    """
+    Queries mixing, per token: an entry keyword, a synonym, a question word,
+    a truncated keyword (substring hit) or a random unseen word.
+    """
+    rng = random.Random(seed + 2)
+    syn_words = [s for syns in synonyms.values() for s in syns]
+    queries: List[str] = []
+    for _ in range(n_queries):
+        f = entries[rng.randrange(len(entries))]
+        toks: List[str] = []
+        for _ in range(rng.randint(1, 6)):
+            r = rng.random()
+            if r < 0.35:
+                toks.append(rng.choice(f.keywords))
+            elif r < 0.5:
+                toks.append(rng.choice(syn_words))
+            elif r < 0.75:
+                toks.append(rng.choice(f.question.rstrip("?").split()))
+            elif r < 0.9:
+                kw = rng.choice(f.keywords)
+                toks.append(kw[:max(3, len(kw) - 2)])
+            else:
+                toks.append(_word(rng))
+        queries.append(" ".join(toks))
+    return queries
+
+def make_workload(entries: List[FAQEntry], synonyms: Dict[str, List[str]],
+                  n_queries: int, n_distinct: int = 1000, seed: int = 0) -> List[str]:
+    """
+    A query log: n_queries drawn from n_distinct make_queries() texts with
+    skewed frequencies, so popular questions repeat as in real traffic.
+    """
+    rng = random.Random(seed + 3)
+    distinct = make_queries(entries, synonyms, n_distinct, seed)
+    return [_skewed_choice(rng, distinct) for _ in range(n_queries)]
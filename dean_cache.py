@@ -0,0 +1,81 @@
+# dean_cache.py
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+_MISSING = object()
+
+# -------------------------
+# Bounded, thread-safe LRU cache for query results
+# -------------------------
+
+def query_key(toks: List[str], categories: Optional[Tuple[str, ...]] = None,
+              phrases: Iterable[Tuple[str, ...]] = ()) -> Tuple[Tuple[str, ...], Optional[Tuple[str, ...]], Tuple[Tuple[str, ...], ...]]:
+    """
+    Cache key of a tokenized query:
+    - tokens are already lowercased and stripped of punctuation
+    - sorted, because apart from phrases the score only depends on the
+      token multiset
+    - categories as returned by dean_index.normalize_categories
+    - phrases: the query's phrase hits (KnowledgeIndex.phrase_hits), the
+      only order-dependent part of the score
+    """
+    return tuple(sorted(toks)), categories, tuple(sorted(phrases))
+
+class QueryCache:
+    """
+    LRU cache keyed on query_key(...).
+
+    invalidate() drops every entry and bumps the generation; a put() made
+    with the generation read before the invalidation is ignored, so a
+    result computed on an old knowledge base never lands in the cache.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.generation = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Drop all entries (e.g. after the knowledge base was reloaded)."""
+        with self._lock:
+            self._data.clear()
+            self.generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "generation": self.generation,
+            }
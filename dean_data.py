@@ -1,7 +1,11 @@
 # faq_data.py
 
-from dataclasses import dataclass
-from typing import List, Dict
+import os
+import re
+import sys
+import threading
+from dataclasses import FrozenInstanceError
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
 
 # Categories as strings for simplicity
 CATEGORIES = [
@@ -9,12 +13,98 @@ CATEGORIES = [
     "Graduation", "Appeals", "Documents", "Schedule", "Policies",
 ]
 
-@dataclass
+# Token separator shared with dean_logic.tokenize
+TOKEN_SPLIT = re.compile(r"[^A-Za-z0-9]+")
+
+# -------------------------
+# Compact entry representation
+# - FAQEntry and EntryFeatures have no per-instance __dict__
+# - keyword and token strings are interned: one copy per distinct string
+# - categories are small integer ids into CATEGORY_NAMES
+# -------------------------
+
+# Category names by id; CATEGORIES come first, so their id is their position
+CATEGORY_NAMES: List[str] = list(CATEGORIES)
+_CATEGORY_IDS: Dict[str, int] = {c: i for i, c in enumerate(CATEGORY_NAMES)}
+_CATEGORY_LOCK = threading.Lock()
+
+def category_id(name: str) -> int:
+    """Id of a category name; names outside CATEGORIES are registered on first use."""
+    cid = _CATEGORY_IDS.get(name)
+    if cid is None:
+        with _CATEGORY_LOCK:
+            cid = _CATEGORY_IDS.get(name)
+            if cid is None:
+                cid = len(CATEGORY_NAMES)
+                CATEGORY_NAMES.append(sys.intern(name))
+                _CATEGORY_IDS[CATEGORY_NAMES[cid]] = cid
+    return cid
+
+class EntryFeatures(NamedTuple):
+    """Normalized, immutable view of an entry used by the scorer."""
+    keywords: Tuple[str, ...]            # lowercased, in order
+    question_tokens: Tuple[str, ...]     # tokenized question, in order
+    synonyms: Tuple[FrozenSet[str], ...]  # synonym set of each keyword
+    # (token sequence, points) of every multi-word keyword (3) and
+    # multi-word synonym of a keyword (2), e.g. (("financial", "aid"), 3)
+    phrases: Tuple[Tuple[Tuple[str, ...], int], ...] = ()
+
 class FAQEntry:
-    question: str
-    answer: str
-    keywords: List[str]
-    cat: str  # category
+    """
+    One FAQ entry; immutable. Reads like the former dataclass (question,
+    answer, keywords, cat) but keywords is a tuple of interned strings
+    and the category is stored as cat_id.
+    """
+
+    __slots__ = ("question", "answer", "keywords", "cat_id", "features")
+
+    def __init__(self, question: str, answer: str, keywords: Iterable[str], cat: str,
+                 features: Optional[EntryFeatures] = None):
+        init = object.__setattr__
+        init(self, "question", question)
+        init(self, "answer", answer)
+        init(self, "keywords", tuple(sys.intern(k) for k in keywords))
+        init(self, "cat_id", category_id(cat))
+        # Compiled by compile_knowledge_base (see _attach_features)
+        init(self, "features", features)
+
+    @property
+    def cat(self) -> str:
+        return CATEGORY_NAMES[self.cat_id]
+
+    def replace(self, **changes: Any) -> "FAQEntry":
+        """Copy with some fields changed; features are recompiled unless passed."""
+        fields = {"question": self.question, "answer": self.answer, "keywords": self.keywords, "cat": self.cat}
+        fields.update(changes)
+        return FAQEntry(**fields)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+    def _key(self) -> tuple:
+        return self.question, self.answer, self.keywords, self.cat_id
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FAQEntry):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __reduce__(self) -> tuple:
+        # By category name: ids are only meaningful inside one process
+        return FAQEntry, (self.question, self.answer, self.keywords, self.cat, self.features)
+
+    def __repr__(self) -> str:
+        return (f"FAQEntry(question={self.question!r}, answer={self.answer!r}, "
+                f"keywords={list(self.keywords)!r}, cat={self.cat!r})")
+
+def _attach_features(f: FAQEntry, features: EntryFeatures) -> None:
+    object.__setattr__(f, "features", features)
 
 # Synonym map (lowercase only)
 SYNONYMS: Dict[str, List[str]] = {
@@ -30,6 +120,21 @@ SYNONYMS: Dict[str, List[str]] = {
     "probation": ["academic warning", "poor performance"],
 }
 
+def compile_synonyms(synonyms: Dict[str, List[str]]) -> Tuple[Dict[str, FrozenSet[str]], Dict[str, FrozenSet[str]]]:
+    """
+    Compile a synonym map into:
+    - forward sets: keyword -> frozenset of synonyms
+    - reverse map: synonym -> frozenset of keywords that list it
+    """
+    forward = {kw: frozenset(syns) for kw, syns in synonyms.items()}
+    reverse: Dict[str, set] = {}
+    for kw, syns in synonyms.items():
+        for s in syns:
+            reverse.setdefault(s, set()).add(kw)
+    return forward, {s: frozenset(kws) for s, kws in reverse.items()}
+
+SYNONYM_SETS, REVERSE_SYNONYMS = compile_synonyms(SYNONYMS)
+
 # Knowledge base (port from Isabelle)
 KNOWLEDGE_BASE: List[FAQEntry] = [
     FAQEntry(
@@ -267,4 +372,72 @@ KNOWLEDGE_BASE: List[FAQEntry] = [
     ),
 ]
 
-TOTAL_FAQS = len(KNOWLEDGE_BASE)
\ No newline at end of file
+
+# -------------------------
+# Precompiled features (built once at load)
+# -------------------------
+
+_NO_SYNONYMS: FrozenSet[str] = frozenset()
+
+def compile_entry(f: FAQEntry, synonyms: Optional[Dict[str, List[str]]] = None) -> EntryFeatures:
+    """Lowercase keywords, tokenize the question and resolve synonym sets."""
+    syn_sets = SYNONYM_SETS if synonyms is None else compile_synonyms(synonyms)[0]
+    return _compile_entry(f, syn_sets)
+
+def phrase_tokens(text: str) -> Tuple[str, ...]:
+    """Token sequence of a keyword or synonym, tokenized like a query."""
+    return tuple(sys.intern(t.lower()) for t in TOKEN_SPLIT.split(text) if t)
+
+def compile_phrases(keywords: Tuple[str, ...], synonyms: Tuple[FrozenSet[str], ...]) -> Tuple[Tuple[Tuple[str, ...], int], ...]:
+    """Multi-word keywords (3 points) and multi-word synonyms (2 points) as token sequences."""
+    phrases = []
+    for kw, syns in zip(keywords, synonyms):
+        seq = phrase_tokens(kw)
+        if len(seq) > 1:
+            phrases.append((seq, 3))
+        for s in sorted(syns):
+            seq = phrase_tokens(s)
+            if len(seq) > 1:
+                phrases.append((seq, 2))
+    return tuple(phrases)
+
+def _compile_entry(f: FAQEntry, syn_sets: Dict[str, FrozenSet[str]]) -> EntryFeatures:
+    kws = tuple(sys.intern(k.lower()) for k in f.keywords)
+    if kws == f.keywords:
+        kws = f.keywords  # already lowercase: share the entry's tuple
+    q_tokens = tuple(sys.intern(t.lower()) for t in TOKEN_SPLIT.split(f.question) if t)
+    syns = tuple(syn_sets.get(k, _NO_SYNONYMS) for k in kws)
+    return EntryFeatures(
+        keywords=kws,
+        question_tokens=q_tokens,
+        synonyms=syns,
+        phrases=compile_phrases(kws, syns),
+    )
+
+def compile_knowledge_base(entries: List[FAQEntry], synonyms: Optional[Dict[str, List[str]]] = None) -> None:
+    """Attach compiled features to every entry."""
+    syn_sets = SYNONYM_SETS if synonyms is None else compile_synonyms(synonyms)[0]
+    for f in entries:
+        _attach_features(f, _compile_entry(f, syn_sets))
+
+compile_knowledge_base(KNOWLEDGE_BASE)
+
+# -------------------------
+# Optional external knowledge base
+# DEANS_FAQ_KB=path/to/kb.{json,jsonl,csv,kbsnap} replaces the literals
+# above; the names stay the same for existing imports.
+# -------------------------
+
+KB_SOURCE: Optional[str] = os.environ.get("DEANS_FAQ_KB") or None
+# KnowledgeIndex.state() when KB_SOURCE is a compiled snapshot
+KB_INDEX_STATE: Optional[tuple] = None
+
+if KB_SOURCE:
+    from dean_store import load_knowledge_base
+    _loaded = load_knowledge_base(KB_SOURCE)
+    KNOWLEDGE_BASE, SYNONYMS, CATEGORIES = _loaded.entries, _loaded.synonyms, _loaded.categories
+    SYNONYM_SETS, REVERSE_SYNONYMS = compile_synonyms(SYNONYMS)
+    KB_INDEX_STATE = _loaded.index_state
+    del _loaded
+
+TOTAL_FAQS = len(KNOWLEDGE_BASE)
@@ -0,0 +1,184 @@
+# dean_fuzzy.py
+
+import os
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, Optional, Set
+
+# -------------------------
+# Typo-tolerant matching (SymSpell-style)
+# - a query token fuzzy-matches a word (keyword or synonym) when they
+#   differ by 1..max_edits(token) edits: inserted, deleted or substituted
+#   letters, or two adjacent letters swapped ("transcrpit")
+# - a misspelled keyword scores 3 - FUZZY_PENALTY, a misspelled synonym
+#   2 - FUZZY_PENALTY (never below 0); a pair with no exact or synonym
+#   hit scores the better of that and the 1-point substring rule
+# - DeletionIndex finds those words without comparing the token against
+#   every keyword
+# -------------------------
+
+# Points taken off a hit for being misspelled
+FUZZY_PENALTY = int(os.environ.get("DEANS_FAQ_FUZZY_PENALTY", "1"))
+# Most edits ever allowed between a token and a word; 0 turns fuzzy matching off
+FUZZY_MAX_DISTANCE = int(os.environ.get("DEANS_FAQ_FUZZY_DISTANCE", "2"))
+# One edit is allowed per this many letters of the token (shorter: none)
+FUZZY_CHARS_PER_EDIT = 4
+
+def configure(penalty: Optional[int] = None, max_distance: Optional[int] = None) -> None:
+    """
+    Change the fuzzy penalty and/or max edit distance. Indexes built
+    before the change keep the old scores and neighbourhoods: rebuild
+    them (dean_logic.reload_knowledge_base) afterwards. A DeletionIndex
+    restored from a state saved under other settings rebuilds itself.
+    """
+    global FUZZY_PENALTY, FUZZY_MAX_DISTANCE
+    if penalty is not None:
+        FUZZY_PENALTY = penalty
+    if max_distance is not None:
+        FUZZY_MAX_DISTANCE = max_distance
+    fuzzy_match.cache_clear()
+    fuzzy_score.cache_clear()
+
+def effective_distance() -> int:
+    """Most edits any token is allowed under the current settings (0: fuzzy off)."""
+    return 0 if FUZZY_PENALTY >= 3 else FUZZY_MAX_DISTANCE
+
+def max_edits(length: int) -> int:
+    """Edits allowed for a query token of this length."""
+    if FUZZY_PENALTY >= 3:  # a misspelled keyword would score nothing
+        return 0
+    return min(FUZZY_MAX_DISTANCE, length // FUZZY_CHARS_PER_EDIT)
+
+def keyword_points() -> int:
+    """Points for a misspelled keyword."""
+    return max(3 - FUZZY_PENALTY, 0)
+
+def synonym_points() -> int:
+    """Points for a misspelled synonym of a keyword."""
+    return max(2 - FUZZY_PENALTY, 0)
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein + adjacent swaps),
+    or limit + 1 as soon as it is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: Optional[list] = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cb = b[j - 1]
+            d = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if prev2 is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                d = min(d, prev2[j - 2] + 1)
+            cur[j] = d
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+@lru_cache(maxsize=65536)
+def fuzzy_match(tok: str, word: str) -> bool:
+    """True if tok is a misspelling of word (1..max_edits(len(tok)) edits)."""
+    limit = max_edits(len(tok))
+    return limit > 0 and tok != word and edit_distance(tok, word, limit) <= limit
+
+@lru_cache(maxsize=65536)
+def fuzzy_score(tok: str, kw: str, synonyms: FrozenSet[str]) -> int:
+    """Points for tok as a misspelling of the keyword or one of its synonyms (0: neither)."""
+    if max_edits(len(tok)) == 0:
+        return 0
+    if fuzzy_match(tok, kw):
+        return keyword_points()
+    if any(fuzzy_match(tok, s) for s in synonyms):
+        return synonym_points()
+    return 0
+
+class DeletionIndex:
+    """
+    Words within max_edits(len(token)) edits of a token, found in a
+    bounded number of lookups (SymSpell):
+    - two strings within d edits become equal after deleting at most d
+      letters from each, so every word is stored under each string its
+      first PREFIX letters give with up to d deletions, and a token only
+      looks up its own deletions
+    - comparing prefixes bounds the number of deletions per word; the
+      candidates are then verified with edit_distance
+    - the deletions stored depend on effective_distance() at build time,
+      which state() records
+    """
+
+    PREFIX = 7
+
+    def __init__(self, words: Iterable[str] = ()):
+        self._distance = effective_distance()
+        self._words: Set[str] = set()
+        self._deletions: Dict[str, Set[str]] = {}
+        for w in words:
+            if w not in self._words:
+                self._words.add(w)
+                for d in self._deletions_of(w, self._depth(len(w))):
+                    self._deletions.setdefault(d, set()).add(w)
+
+    def state(self) -> tuple:
+        """Plain-data form of the index (see dean_store snapshots)."""
+        return self._distance, self._words, self._deletions
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "DeletionIndex":
+        """Restore state(); rebuilt from its words if the fuzzy settings changed since."""
+        distance, words, deletions = state
+        if distance != effective_distance():
+            return cls(words)
+        self = cls.__new__(cls)
+        self._distance, self._words, self._deletions = distance, words, deletions
+        return self
+
+    def add(self, word: str) -> None:
+        # Sets are replaced, never mutated, so concurrent lookups stay valid.
+        if word in self._words:
+            return
+        for d in self._deletions_of(word, self._depth(len(word))):
+            self._deletions[d] = self._deletions.get(d, set()) | {word}
+        self._words.add(word)
+
+    def remove(self, word: str) -> None:
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        for d in self._deletions_of(word, self._depth(len(word))):
+            rest = self._deletions.get(d, set()) - {word}
+            if rest:
+                self._deletions[d] = rest
+            else:
+                self._deletions.pop(d, None)
+
+    @staticmethod
+    def _depth(length: int) -> int:
+        # Deletions needed for a word of this length: the most edits any
+        # token it can match (length ± edits letters) is allowed
+        return max((d for d in range(1, FUZZY_MAX_DISTANCE + 1) if max_edits(length + d) >= d), default=0)
+
+    @classmethod
+    def _deletions_of(cls, word: str, depth: int) -> FrozenSet[str]:
+        found = {word[:cls.PREFIX]}
+        layer = found
+        for _ in range(depth):
+            layer = {s[:i] + s[i + 1:] for s in layer for i in range(len(s))}
+            found |= layer
+        return frozenset(found)
+
+    def lookup(self, tok: str) -> Set[str]:
+        """Indexed words tok fuzzy-matches (see fuzzy_match)."""
+        limit = max_edits(len(tok))
+        if limit == 0:
+            return set()
+        found: Set[str] = set()
+        deletions = self._deletions
+        for d in self._deletions_of(tok, limit):
+            words = deletions.get(d)
+            if words:
+                found |= words
+        return {w for w in found if fuzzy_match(tok, w)}
@@ -0,0 +1,918 @@
+# dean_index.py
+
+import bisect
+import heapq
+import threading
+from collections import Counter, deque
+from typing import TYPE_CHECKING, Container, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple, Union
+import dean_fuzzy
+from dean_data import EntryFeatures, FAQEntry, compile_entry, compile_synonyms
+from dean_fuzzy import DeletionIndex, fuzzy_score
+
+if TYPE_CHECKING:
+    from dean_metrics import QueryTrace
+
+# A posting is (entry id, keyword contribution, question-overlap contribution).
+# The keyword part is multiplied by how often the token occurs in the query,
+# the question part is not (see score_entry in dean_logic).
+Posting = Tuple[int, int, int]
+# An impact layer is (points, ids of the entries a term adds exactly that many points to).
+Layer = Tuple[int, Tuple[int, ...]]
+
+# -------------------------
+# Substring index for the 1-point rule
+# -------------------------
+
+class SubstringIndex:
+    """
+    Answers the substring rule (kw in tok or tok in kw) for one token
+    without comparing it against every keyword:
+    - keywords containing the token: every 1..GRAM-character substring
+      of a keyword is indexed; longer tokens are looked up by their
+      rarest GRAM-gram and then verified
+    - keywords contained in the token: the token's own substrings are
+      looked up in the keyword set
+    """
+
+    GRAM = 3
+
+    def __init__(self, keywords: Iterable[str] = ()):
+        self._keywords: Set[str] = set()
+        self._grams: Dict[str, Set[str]] = {}
+        self._max_len = 0
+        for kw in keywords:
+            if kw not in self._keywords:
+                self._keywords.add(kw)
+                self._max_len = max(self._max_len, len(kw))
+                for gram in self._grams_of(kw):
+                    self._grams.setdefault(gram, set()).add(kw)
+
+    def state(self) -> tuple:
+        """Plain-data form of the index (see dean_store snapshots)."""
+        return self._keywords, self._grams, self._max_len
+
+    @classmethod
+    def from_state(cls, state: tuple) -> "SubstringIndex":
+        self = cls.__new__(cls)
+        self._keywords, self._grams, self._max_len = state
+        return self
+
+    def add(self, kw: str) -> None:
+        # Sets are replaced, never mutated, so concurrent lookups stay valid.
+        if kw in self._keywords:
+            return
+        for gram in self._grams_of(kw):
+            self._grams[gram] = self._grams.get(gram, set()) | {kw}
+        self._max_len = max(self._max_len, len(kw))
+        self._keywords.add(kw)
+
+    def remove(self, kw: str) -> None:
+        if kw not in self._keywords:
+            return
+        self._keywords.discard(kw)
+        for gram in self._grams_of(kw):
+            rest = self._grams.get(gram, set()) - {kw}
+            if rest:
+                self._grams[gram] = rest
+            else:
+                self._grams.pop(gram, None)
+
+    def _grams_of(self, kw: str) -> Set[str]:
+        return {kw[i:i + n] for n in range(1, self.GRAM + 1) for i in range(len(kw) - n + 1)}
+
+    def containing(self, tok: str) -> Set[str]:
+        """Keywords kw with tok in kw."""
+        if len(tok) <= self.GRAM:
+            return set(self._grams.get(tok, ()))
+        rarest: Optional[Set[str]] = None
+        for i in range(len(tok) - self.GRAM + 1):
+            kws = self._grams.get(tok[i:i + self.GRAM])
+            if not kws:
+                return set()
+            if rarest is None or len(kws) < len(rarest):
+                rarest = kws
+        return {kw for kw in rarest or () if tok in kw}
+
+    def contained_in(self, tok: str) -> Set[str]:
+        """Keywords kw with kw in tok."""
+        found: Set[str] = set()
+        if "" in self._keywords:
+            found.add("")
+        kws = self._keywords
+        for i in range(len(tok)):
+            for j in range(i + 1, min(len(tok), i + self._max_len) + 1):
+                if tok[i:j] in kws:
+                    found.add(tok[i:j])
+        return found
+
+    def matches(self, tok: str) -> Set[str]:
+        """Keywords that satisfy kw in tok or tok in kw."""
+        return self.containing(tok) | self.contained_in(tok)
+
+# -------------------------
+# Phrase matcher for multi-word keywords and synonyms
+# -------------------------
+
+Phrase = Tuple[str, ...]
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton whose alphabet is tokens: finds every
+    occurrence of every phrase (token sequence) in a tokenized query in
+    one left-to-right pass, however many phrases there are.
+    """
+
+    def __init__(self, phrases: Iterable[Phrase]):
+        # state -> {token: next state}; state 0 is the root
+        self._goto: List[Dict[str, int]] = [{}]
+        # phrases ending at each state, including those reached via fail links
+        self._out: List[Tuple[Phrase, ...]] = [()]
+        for phrase in phrases:
+            state = 0
+            for tok in phrase:
+                nxt = self._goto[state].get(tok)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][tok] = nxt
+                    self._goto.append({})
+                    self._out.append(())
+                state = nxt
+            if phrase not in self._out[state]:
+                self._out[state] += (phrase,)
+
+        # Breadth-first: a state's fail link is the longest proper suffix
+        # of its path that is also a path from the root.
+        self._fail: List[int] = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for tok, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and tok not in self._goto[f]:
+                    f = self._fail[f]
+                fail = self._goto[f].get(tok, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def find(self, toks: Iterable[str]) -> List[Phrase]:
+        """Every phrase occurrence in toks (overlaps included), in order of their end."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found: List[Phrase] = []
+        state = 0
+        for tok in toks:
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            if out[state]:
+                found.extend(out[state])
+        return found
+
+# -------------------------
+# Inverted index over one partition of the knowledge base
+# -------------------------
+
+class PartitionIndex:
+    """
+    Inverted index over a subset of the knowledge base (one category, or
+    all of it). Entries keep their global id (position in the knowledge
+    base), so results from several partitions can be merged with the
+    same tie-break as find_best.
+
+    Scores are identical to dean_logic.score_entry: a query only touches
+    the entries that share a token with it, and entries that are never
+    touched score 0.
+
+    Entries can be patched in place (insert/delete); ids in the shared
+    `dead` set are tombstones, skipped by every query until KnowledgeIndex
+    compacts them away. Compaction swaps in a new set rather than emptying
+    this one, and a query reads the set once, before any posting list, so
+    it skips the purged ids even in lists from before the purge. Writers
+    must hold `lock` (KnowledgeIndex passes
+    its write lock). Readers take it only to fill a cache on a token's
+    first use, so a list built from rows a writer is patching is never
+    cached; otherwise they never lock, since rows, sets and posting
+    tuples are replaced rather than mutated.
+
+    Misspelled tokens are resolved through a DeletionIndex of keywords and
+    synonyms. `fuzzy` shares another partition's (a superset of this
+    one's words, kept up to date by its owner); by default the partition
+    builds and maintains its own.
+    """
+
+    def __init__(self, items: Iterable[Tuple[int, FAQEntry]], synonyms: Dict[str, List[str]],
+                 dead: Optional[Set[int]] = None, fuzzy: Optional[DeletionIndex] = None,
+                 lock: Optional[threading.RLock] = None):
+        # Global ids of the entries in this partition, in order
+        self.ids: List[int] = []
+        self._dead: Set[int] = set() if dead is None else dead
+        self._lock = threading.RLock() if lock is None else lock
+
+        # keyword -> {entry id: number of times the keyword is listed}
+        self._keyword_entries: Dict[str, Dict[int, int]] = {}
+        # question token -> {entry id: occurrences in the question}
+        self._question_entries: Dict[str, Dict[int, int]] = {}
+        # phrase -> {entry id: points per occurrence in the query}
+        self._phrase_entries: Dict[Phrase, Dict[int, int]] = {}
+        for eid, f in items:
+            self.ids.append(eid)
+            feats = f.features if f.features is not None else compile_entry(f, synonyms)
+            for kw in feats.keywords:
+                row = self._keyword_entries.setdefault(kw, {})
+                row[eid] = row.get(eid, 0) + 1
+            for t in feats.question_tokens:
+                row = self._question_entries.setdefault(t, {})
+                row[eid] = row.get(eid, 0) + 1
+            for phrase, points in feats.phrases:
+                row = self._phrase_entries.setdefault(phrase, {})
+                row[eid] = row.get(eid, 0) + points
+        self._phrases = PhraseMatcher(self._phrase_entries)
+
+        # keyword -> its synonyms; synonym -> keywords (present in the index) that list it
+        self._synonym_sets, reverse = compile_synonyms(synonyms)
+        self._synonym_of: Dict[str, FrozenSet[str]] = {}
+        for syn, kws in reverse.items():
+            owners = frozenset(kw for kw in kws if kw in self._keyword_entries)
+            if owners:
+                self._synonym_of[syn] = owners
+
+        self._substrings = SubstringIndex(self._keyword_entries)
+        self._owns_fuzzy = fuzzy is None
+        self._fuzzy = DeletionIndex([*self._keyword_entries, *self._synonym_of]) if fuzzy is None else fuzzy
+
+        # Posting lists are precomputed lazily for tokens of the corpus
+        # vocabulary; any other token is resolved per query.
+        self._vocabulary = set(self._keyword_entries) | set(self._question_entries) | set(self._synonym_of)
+        self._postings: Dict[str, Tuple[Posting, ...]] = {}
+        # token -> impact layers of its cached posting list (see pruned_scores)
+        self._impacts: Dict[str, Tuple[Layer, ...]] = {}
+
+    def state(self) -> tuple:
+        """Plain-data form of the partition (see dean_store snapshots)."""
+        return (self.ids, self._keyword_entries, self._question_entries, self._phrase_entries,
+                self._synonym_sets, self._synonym_of, self._substrings.state(),
+                self._fuzzy.state() if self._owns_fuzzy else None)
+
+    @classmethod
+    def from_state(cls, state: tuple, dead: Optional[Set[int]] = None,
+                   fuzzy: Optional[DeletionIndex] = None,
+                   lock: Optional[threading.RLock] = None) -> "PartitionIndex":
+        """Rebuild a partition from state() without re-deriving anything."""
+        self = cls.__new__(cls)
+        (self.ids, self._keyword_entries, self._question_entries, self._phrase_entries,
+         self._synonym_sets, self._synonym_of, substrings, fuzzy_state) = state
+        self._dead = set() if dead is None else dead
+        self._lock = threading.RLock() if lock is None else lock
+        self._phrases = PhraseMatcher(self._phrase_entries)
+        self._substrings = SubstringIndex.from_state(substrings)
+        self._owns_fuzzy = fuzzy_state is not None
+        self._fuzzy = DeletionIndex.from_state(fuzzy_state) if fuzzy_state is not None else fuzzy
+        self._vocabulary = set(self._keyword_entries) | set(self._question_entries) | set(self._synonym_of)
+        self._postings = {}
+        self._impacts = {}
+        return self
+
+    # -------------------------
+    # Token resolution
+    # -------------------------
+
+    def keyword_hits(self, tok: str) -> Dict[str, int]:
+        """Return {keyword: score} for every indexed keyword the token hits (see _hit)."""
+        hits = _fuzzy_hits(self._fuzzy.lookup(tok), self._keyword_entries, self._synonym_of)
+        for kw in self._substrings.matches(tok):
+            hits[kw] = max(hits.get(kw, 0), 1)
+        for kw in self._synonym_of.get(tok, ()):
+            hits[kw] = 2
+        if tok in self._keyword_entries:
+            hits[tok] = 3
+        return hits
+
+    def postings(self, tok: str) -> Tuple[Posting, ...]:
+        """Return the posting list of a query token, ordered by entry id."""
+        cached = self._postings.get(tok)
+        if cached is not None:
+            return cached
+        if tok not in self._vocabulary:
+            return self._build_postings(tok)
+        # Built and cached under the write lock: a writer patches every
+        # cached list, so one built from rows it is changing must not be
+        # cached behind its back
+        with self._lock:
+            cached = self._postings.get(tok)
+            if cached is None:
+                cached = self._postings[tok] = self._build_postings(tok)
+            return cached
+
+    def _build_postings(self, tok: str) -> Tuple[Posting, ...]:
+        contrib: Dict[int, List[int]] = {}
+        for kw, sc in self.keyword_hits(tok).items():
+            for eid, n in self._keyword_entries.get(kw, {}).items():
+                contrib.setdefault(eid, [0, 0])[0] += sc * n
+        for eid, n in self._question_entries.get(tok, {}).items():
+            contrib.setdefault(eid, [0, 0])[1] += n
+        return tuple((eid, kw_sc, q_sc) for eid, (kw_sc, q_sc) in sorted(contrib.items()))
+
+    def _impact_layers(self, tok: str, n: int) -> Tuple[Layer, ...]:
+        """Impact layers of a token occurring n times in the query."""
+        if n != 1:
+            return _impact_layers((eid, n * kw_sc + q_sc) for eid, kw_sc, q_sc in self.postings(tok))
+        layers = self._impacts.get(tok)
+        if layers is not None:
+            return layers
+        if tok not in self._vocabulary:
+            return _impact_layers((eid, kw_sc + q_sc) for eid, kw_sc, q_sc in self.postings(tok))
+        # Cached under the write lock, like the posting list it is derived
+        # from: a writer patching that list in between would otherwise
+        # leave these layers stale
+        with self._lock:
+            layers = self._impacts.get(tok)
+            if layers is None:
+                layers = _impact_layers((eid, kw_sc + q_sc) for eid, kw_sc, q_sc in self.postings(tok))
+                self._impacts[tok] = layers
+            return layers
+
+    def phrase_hits(self, toks: Sequence[str]) -> List[Phrase]:
+        """Occurrences of this partition's phrases in the (ordered) query tokens."""
+        return self._phrases.find(toks) if self._phrases else []
+
+    # -------------------------
+    # Incremental updates
+    # -------------------------
+
+    def insert(self, eid: int, feats: EntryFeatures) -> None:
+        """Add an entry's contributions under global id eid."""
+        if eid not in self.ids:
+            ids = list(self.ids)
+            bisect.insort(ids, eid)
+            self.ids = ids
+        self._patch(eid, feats, 1)
+
+    def delete(self, eid: int, feats: EntryFeatures) -> None:
+        """Remove exactly the contributions insert(eid, feats) added."""
+        self._patch(eid, feats, -1)
+        if eid in self.ids:
+            self.ids = [e for e in self.ids if e != eid]
+
+    def _patch(self, eid: int, feats: EntryFeatures, sign: int) -> None:
+        kw_counts = Counter(feats.keywords)
+        q_counts = Counter(feats.question_tokens)
+
+        for kw, n in kw_counts.items():
+            change = _patch_row(self._keyword_entries, kw, eid, sign * n)
+            if change == "added":
+                self._substrings.add(kw)
+                for syn in self._synonym_sets.get(kw, ()):
+                    self._synonym_of[syn] = self._synonym_of.get(syn, frozenset()) | {kw}
+                    self._vocabulary.add(syn)
+                self._vocabulary.add(kw)
+            elif change == "removed":
+                self._substrings.remove(kw)
+                for syn in self._synonym_sets.get(kw, ()):
+                    owners = self._synonym_of.get(syn, frozenset()) - {kw}
+                    if owners:
+                        self._synonym_of[syn] = owners
+                    else:
+                        self._synonym_of.pop(syn, None)
+            if change and self._owns_fuzzy:
+                for word in (kw, *self._synonym_sets.get(kw, ())):
+                    if word in self._keyword_entries or word in self._synonym_of:
+                        self._fuzzy.add(word)
+                    else:
+                        self._fuzzy.remove(word)
+        for t, n in q_counts.items():
+            _patch_row(self._question_entries, t, eid, sign * n)
+            self._vocabulary.add(t)
+        phrases_changed = False
+        for phrase, points in feats.phrases:
+            phrases_changed |= _patch_row(self._phrase_entries, phrase, eid, sign * points) is not None
+        if phrases_changed:
+            self._phrases = PhraseMatcher(self._phrase_entries)
+
+        # Cached posting lists: add/subtract this entry's contribution.
+        for tok, plist in list(self._postings.items()):
+            kw_sc = sum(n * _hit(tok, kw, self._synonym_sets) for kw, n in kw_counts.items())
+            q_sc = q_counts.get(tok, 0)
+            if kw_sc or q_sc:
+                self._postings[tok] = _patch_postings(plist, eid, sign * kw_sc, sign * q_sc)
+                self._impacts.pop(tok, None)
+
+    # -------------------------
+    # Scoring and selection
+    # -------------------------
+
+    def score(self, toks: Sequence[str], phrases: Optional[Iterable[Phrase]] = None) -> Dict[int, int]:
+        """
+        Return {entry id: score} for every live entry with a non-zero score.
+        phrases: the query's phrase hits if already known (phrase_hits of
+        a partition holding at least this one's phrases).
+        """
+        dead = self._dead
+        scores: Dict[int, int] = {}
+        for tok, n in Counter(toks).items():
+            for eid, kw_sc, q_sc in self.postings(tok):
+                scores[eid] = scores.get(eid, 0) + n * kw_sc + q_sc
+        self._add_phrases(scores, self.phrase_hits(toks) if phrases is None else phrases)
+        if dead:
+            scores = {eid: sc for eid, sc in scores.items() if eid not in dead}
+        return scores
+
+    def _add_phrases(self, scores: Dict[int, int], phrases: Iterable[Phrase]) -> None:
+        for phrase in phrases:
+            for eid, points in self._phrase_entries.get(phrase, {}).items():
+                scores[eid] = scores.get(eid, 0) + points
+
+    def live_ids(self) -> List[int]:
+        """Ids of the entries in this partition that are not tombstoned."""
+        dead = self._dead
+        return [eid for eid in self.ids if eid not in dead] if dead else self.ids
+
+    def pruned_scores(self, toks: Sequence[str], k: int,
+                      phrases: Optional[Iterable[Phrase]] = None) -> Dict[int, int]:
+        """
+        Exact scores of every live entry that can still be in the top k
+        (MaxScore-style pruning); always includes score()'s top k.
+        - every term (query token or phrase hit) is split into impact
+          layers: the entries it adds exactly c points to, for each c
+        - layers are added highest c first; a term can add at most the c
+          of its next layer to any entry, so the sum of those bounds is
+          all that the layers left can add
+        - once that bound is below the k-th best score so far, unseen
+          entries cannot make the top k: entries already seen that cannot
+          reach the k-th best score any more are dropped, and the layers
+          left only update the others
+        """
+        dead = self._dead
+        terms = [self._impact_layers(tok, n) for tok, n in Counter(toks).items()]
+        for phrase, n in Counter(self.phrase_hits(toks) if phrases is None else phrases).items():
+            row = self._phrase_entries.get(phrase)
+            if row:
+                terms.append(_impact_layers((eid, n * points) for eid, points in sorted(row.items())))
+        order = sorted(((layers[i][0], t, i) for t, layers in enumerate(terms) for i in range(len(layers))),
+                       key=lambda x: -x[0])
+
+        rest = sum(layers[0][0] for layers in terms if layers)
+        reached = 0  # upper bound of any score so far: first-layer bounds of the terms started
+        scores: Dict[int, int] = {}
+        seen_all = True  # False once unseen entries can no longer make the top k
+        for c, t, i in order:
+            layers = terms[t]
+            eids = layers[i][1]
+            rest += (layers[i + 1][0] if i + 1 < len(layers) else 0) - c
+            if not i:
+                reached += c
+            if seen_all:
+                for eid in eids:
+                    scores[eid] = scores.get(eid, 0) + c
+            elif len(scores) * 8 < len(eids):
+                size = len(eids)
+                for eid in scores:
+                    j = bisect.bisect_left(eids, eid)
+                    if j < size and eids[j] == eid:
+                        scores[eid] += c
+            else:
+                for eid in eids:
+                    if eid in scores:
+                        scores[eid] += c
+
+            if not seen_all:
+                # Drop candidates again once the bound left has halved
+                if rest * 2 <= kth - cut and len(scores) > k:
+                    cut = kth - rest
+                    scores = {e: sc for e, sc in scores.items() if sc >= cut}
+                continue
+            # The k-th best score so far is at most reached: no use
+            # looking for it while the layers left could add as much.
+            if not rest or rest >= reached or len(scores) < k:
+                continue
+            values = scores.values() if not dead else [sc for e, sc in scores.items() if e not in dead]
+            if len(values) < k:
+                continue
+            kth = heapq.nlargest(k, values)[-1]
+            if rest >= kth:
+                continue
+            seen_all = False
+            cut = kth - rest
+            scores = {e: sc for e, sc in scores.items() if sc >= cut and e not in dead}
+        if dead and seen_all:
+            scores = {eid: sc for eid, sc in scores.items() if eid not in dead}
+        return scores
+
+    def top(self, toks: Sequence[str], k: int, phrases: Optional[Iterable[Phrase]] = None,
+            trace: Optional["QueryTrace"] = None) -> List[Tuple[int, int]]:
+        """
+        The k best (entry id, score) pairs, best first, ties → lowest id.
+        Only entries pruned_scores() cannot rule out are fully scored, and
+        selection uses a bounded heap of size k rather than sorting them.
+        If fewer than k entries score, the rest is filled with zero-score
+        entries in order (find_best keeps the first candidate when nothing
+        scores, since 0 > -1).
+        """
+        if k <= 0:
+            return []
+        scores = self.pruned_scores(toks, k, phrases)
+        if trace is not None:
+            trace.lap("score")
+            trace.scored += len(scores)
+        top = heapq.nsmallest(k, scores.items(), key=_rank)
+        if len(top) < k:
+            for eid in self.live_ids():
+                if eid not in scores:
+                    top.append((eid, 0))
+                    if len(top) == k:
+                        break
+        if trace is not None:
+            trace.lap("select")
+        return top
+
+    def top_many(self, token_lists: Sequence[List[str]],
+                 phrase_lists: Optional[Sequence[List[Phrase]]] = None) -> List[Optional[Tuple[int, int]]]:
+        """
+        top(toks, 1)[0] for a whole batch of tokenized queries in one pass:
+        - identical queries (same token multiset and phrase hits) are scored once
+        - the batch is turned into a sparse query-term matrix, and each
+          term's posting list is fetched once and added into every query
+          that uses it
+        """
+        dead = self._dead
+        if phrase_lists is None:
+            phrase_lists = [self.phrase_hits(toks) for toks in token_lists]
+        keys: List[tuple] = []
+        rows: Dict[tuple, int] = {}
+        for toks, phrases in zip(token_lists, phrase_lists):
+            key = (tuple(sorted(toks)), tuple(sorted(phrases)))
+            keys.append(key)
+            rows.setdefault(key, len(rows))
+
+        # term -> [(row, count in query)]
+        columns: Dict[str, List[Tuple[int, int]]] = {}
+        for (toks, _), row in rows.items():
+            for tok, n in Counter(toks).items():
+                columns.setdefault(tok, []).append((row, n))
+
+        scores: List[Dict[int, int]] = [{} for _ in rows]
+        for tok, col in columns.items():
+            plist = self.postings(tok)
+            for row, n in col:
+                acc = scores[row]
+                for eid, kw_sc, q_sc in plist:
+                    acc[eid] = acc.get(eid, 0) + n * kw_sc + q_sc
+        for (_, phrases), row in rows.items():
+            self._add_phrases(scores[row], phrases)
+
+        if dead:
+            scores = [{e: sc for e, sc in acc.items() if e not in dead} for acc in scores]
+        live = self.live_ids()
+        fallback = (live[0], 0) if live else None
+        winners = [min(acc.items(), key=_rank) if acc else fallback for acc in scores]
+        return [winners[rows[key]] for key in keys]
+
+# -------------------------
+# Category-partitioned knowledge index
+# -------------------------
+
+CategoryFilter = Union[None, str, Iterable[str]]
+
+def normalize_categories(category_filter: CategoryFilter) -> Optional[Tuple[str, ...]]:
+    """None → no filter; a category name or several → sorted tuple of names."""
+    if category_filter is None:
+        return None
+    if isinstance(category_filter, str):
+        return (category_filter,)
+    return tuple(sorted(set(category_filter)))
+
+class KnowledgeIndex:
+    """
+    Knowledge base index partitioned by category.
+
+    One PartitionIndex covers all entries (unfiltered queries) and one per
+    category covers that category's entries, so a filtered query only
+    scores inside its partition(s). Multi-category filters merge the
+    partitions' results by (score, entry id).
+
+    Entry ids are stable: add() appends a new id, update() keeps the id
+    (and so the entry's tie-break position), remove() tombstones it.
+    Tombstones are purged by compact(), which runs automatically once
+    they exceed COMPACT_MIN and COMPACT_RATIO of the live entries.
+    """
+
+    COMPACT_MIN = 64
+    COMPACT_RATIO = 0.1
+
+    def __init__(self, entries: Sequence[FAQEntry], synonyms: Dict[str, List[str]]):
+        # Entry (or None once compacted away) per global id
+        self._slots: List[Optional[FAQEntry]] = list(entries)
+        self._features: List[Optional[EntryFeatures]] = [
+            f.features if f.features is not None else compile_entry(f, synonyms) for f in self._slots
+        ]
+        # Set by dean_logic.install_index when this index goes live
+        self.generation = 0
+        self._dead: Set[int] = set()
+        self._live: Optional[List[FAQEntry]] = list(self._slots)
+        # Held by writers, and by readers filling a cache (see PartitionIndex)
+        self._write_lock = threading.RLock()
+
+        self._all = PartitionIndex(enumerate(self._slots), synonyms, self._dead, lock=self._write_lock)
+        grouped: Dict[str, List[Tuple[int, FAQEntry]]] = {}
+        for eid, f in enumerate(self._slots):
+            grouped.setdefault(f.cat, []).append((eid, f))
+        self._partitions: Dict[str, PartitionIndex] = {
+            cat: PartitionIndex(items, synonyms, self._dead, self._all._fuzzy, self._write_lock)
+            for cat, items in grouped.items()
+        }
+
+    def state(self) -> tuple:
+        """Plain-data form of the index (see dean_store snapshots)."""
+        if len(self.entries) != len(self._slots):
+            raise ValueError("index has removed entries; build a fresh KnowledgeIndex to snapshot it")
+        return self._all.state(), {cat: part.state() for cat, part in self._partitions.items()}
+
+    @classmethod
+    def from_state(cls, entries: Sequence[FAQEntry], state: tuple) -> "KnowledgeIndex":
+        """Rebuild the index for entries from state() without re-deriving anything."""
+        self = cls.__new__(cls)
+        self._slots = list(entries)
+        self._features = [f.features if f.features is not None else compile_entry(f) for f in self._slots]
+        self.generation = 0
+        self._dead = set()
+        self._live = list(self._slots)
+        self._write_lock = threading.RLock()
+        all_state, part_states = state
+        self._all = PartitionIndex.from_state(all_state, self._dead, lock=self._write_lock)
+        self._partitions = {cat: PartitionIndex.from_state(st, self._dead, self._all._fuzzy, self._write_lock)
+                            for cat, st in part_states.items()}
+        return self
+
+    # -------------------------
+    # Entries
+    # -------------------------
+
+    @property
+    def entries(self) -> List[FAQEntry]:
+        """Live entries, in knowledge base (id) order."""
+        live = self._live
+        if live is None:
+            # Under the write lock, or a concurrent remove() could be undone
+            # by storing a list computed before it
+            with self._write_lock:
+                live = self._live
+                if live is None:
+                    dead = self._dead
+                    live = [f for eid, f in enumerate(self._slots) if f is not None and eid not in dead]
+                    self._live = live
+        return live
+
+    @property
+    def synonym_sets(self) -> Dict[str, FrozenSet[str]]:
+        """Synonyms per keyword the index was built with."""
+        return self._all._synonym_sets
+
+    def entry(self, eid: int) -> FAQEntry:
+        """The entry with global id eid."""
+        f = self._slots[eid]
+        if f is None:
+            raise KeyError(eid)
+        return f
+
+    def id_of(self, entry: FAQEntry) -> int:
+        """Global id of a live entry (by identity)."""
+        for eid, f in enumerate(self._slots):
+            if f is entry and eid not in self._dead:
+                return eid
+        raise KeyError(entry.question)
+
+    def partitions(self, category_filter: CategoryFilter = None) -> List[PartitionIndex]:
+        """The partitions a query with this filter has to look at."""
+        cats = normalize_categories(category_filter)
+        if cats is None:
+            return [self._all]
+        return [self._partitions[c] for c in cats if c in self._partitions]
+
+    def entry_ids(self, category_filter: CategoryFilter = None) -> List[int]:
+        """Ids of the live entries passing the filter, in knowledge base order."""
+        parts = self.partitions(category_filter)
+        if len(parts) == 1:
+            return parts[0].live_ids()
+        return sorted(eid for part in parts for eid in part.live_ids())
+
+    def keyword_hits(self, tok: str) -> Dict[str, int]:
+        return self._all.keyword_hits(tok)
+
+    def phrase_hits(self, toks: Sequence[str]) -> List[Phrase]:
+        """Multi-word keywords/synonyms occurring in the query (the all-entries partition has every phrase)."""
+        return self._all.phrase_hits(toks)
+
+    def postings(self, tok: str) -> Tuple[Posting, ...]:
+        return self._all.postings(tok)
+
+    # -------------------------
+    # Incremental updates (add / update / remove single entries)
+    # -------------------------
+
+    def _partition_for(self, cat: str) -> PartitionIndex:
+        part = self._partitions.get(cat)
+        if part is None:
+            part = PartitionIndex((), self._all._synonym_sets, self._dead, self._all._fuzzy, self._write_lock)
+            self._partitions[cat] = part
+        return part
+
+    def _check_live(self, eid: int) -> None:
+        if not 0 <= eid < len(self._slots) or self._slots[eid] is None or eid in self._dead:
+            raise KeyError(eid)
+
+    def add(self, entry: FAQEntry) -> int:
+        """Append an entry; returns its id."""
+        with self._write_lock:
+            feats = entry.features if entry.features is not None else compile_entry(entry, self._all._synonym_sets)
+            eid = len(self._slots)
+            self._slots.append(entry)
+            self._features.append(feats)
+            self._all.insert(eid, feats)
+            self._partition_for(entry.cat).insert(eid, feats)
+            self._live = None
+            return eid
+
+    def update(self, eid: int, entry: FAQEntry) -> None:
+        """Replace entry eid, keeping its id and position."""
+        with self._write_lock:
+            self._check_live(eid)
+            old_feats, old_cat = self._features[eid], self._slots[eid].cat
+            feats = entry.features if entry.features is not None else compile_entry(entry, self._all._synonym_sets)
+            self._all.delete(eid, old_feats)
+            self._partitions[old_cat].delete(eid, old_feats)
+            self._slots[eid] = entry
+            self._features[eid] = feats
+            self._all.insert(eid, feats)
+            self._partition_for(entry.cat).insert(eid, feats)
+            self._live = None
+
+    def remove(self, eid: int) -> None:
+        """Tombstone entry eid; it stops matching immediately."""
+        with self._write_lock:
+            self._check_live(eid)
+            self._dead.add(eid)
+            self._live = None
+            if len(self._dead) >= max(self.COMPACT_MIN, self.COMPACT_RATIO * len(self._slots)):
+                self._compact()
+
+    def compact(self) -> int:
+        """Purge tombstoned entries from every structure; returns how many."""
+        with self._write_lock:
+            return self._compact()
+
+    def _compact(self) -> int:
+        dead = self._dead
+        for eid in dead:
+            feats = self._features[eid]
+            self._all.delete(eid, feats)
+            self._partitions[self._slots[eid].cat].delete(eid, feats)
+            self._slots[eid] = None
+            self._features[eid] = None
+        # Only now stop filtering them: they are gone from every posting
+        # list. A new set, not dead.clear(): queries already running keep
+        # filtering with the old one, posting lists from before included.
+        fresh: Set[int] = set()
+        for part in (self._all, *self._partitions.values()):
+            part._dead = fresh
+        self._dead = fresh
+        self._live = None
+        return len(dead)
+
+    # -------------------------
+    # Scoring and selection
+    # -------------------------
+
+    def top(self, toks: List[str], k: int, category_filter: CategoryFilter = None,
+            trace: Optional["QueryTrace"] = None) -> List[Tuple[int, int]]:
+        """
+        The k best (entry id, score) pairs across the filtered partitions.
+        trace (dean_metrics.QueryTrace): charged filter/score/select time.
+        """
+        parts = self.partitions(category_filter)
+        if trace is not None:
+            trace.lap("filter")
+        if len(parts) == 1:
+            return parts[0].top(toks, k, None, trace)
+        # Each partition's own top k contains every entry of the merged top k.
+        phrases = self.phrase_hits(toks)
+        found = [p for part in parts for p in part.top(toks, k, phrases, trace)]
+        top = heapq.nsmallest(k, found, key=_rank)
+        if trace is not None:
+            trace.lap("select")
+        return top
+
+    def best(self, toks: List[str], category_filter: CategoryFilter = None,
+             trace: Optional["QueryTrace"] = None) -> Optional[FAQEntry]:
+        """Same result as find_best over the (filtered) entries: ties → lowest id."""
+        top = self.topk(toks, 1, category_filter, trace)
+        return top[0][0] if top else None
+
+    def topk(self, toks: List[str], k: int, category_filter: CategoryFilter = None,
+             trace: Optional["QueryTrace"] = None) -> List[Tuple[FAQEntry, int]]:
+        """The k best (entry, score) pairs, best first; topk(..., 1) agrees with best()."""
+        while True:
+            slots = self._slots
+            top = [(slots[eid], sc) for eid, sc in self.top(toks, k, category_filter, trace)]
+            if all(f is not None for f, _ in top):
+                return top
+            # An entry was removed and compacted away while the query ran:
+            # the index no longer has it, so ask again
+
+    def matching(self, toks: List[str], category_filter: CategoryFilter = None) -> List[Tuple[int, int]]:
+        """Every (entry id, score) with a non-zero score, best first."""
+        phrases = self.phrase_hits(toks)
+        slots = self._slots
+        found = [p for part in self.partitions(category_filter) for p in part.score(toks, phrases).items()
+                 if slots[p[0]] is not None]  # not compacted away while scoring
+        found.sort(key=_rank)
+        return found
+
+    def entries_of(self, ids: Iterable[int]) -> List[FAQEntry]:
+        """Entries for ids from top/matching/entry_ids, minus any compacted away since."""
+        slots = self._slots
+        return [f for f in (slots[eid] for eid in ids) if f is not None]
+
+    def best_many(self, token_lists: Sequence[List[str]], category_filter: CategoryFilter = None) -> List[Optional[FAQEntry]]:
+        """best() for a whole batch of tokenized queries (see PartitionIndex.top_many)."""
+        phrase_lists = [self.phrase_hits(toks) for toks in token_lists]
+        per_part = [part.top_many(token_lists, phrase_lists) for part in self.partitions(category_filter)]
+        result: List[Optional[FAQEntry]] = []
+        slots = self._slots
+        for toks, winners in zip(token_lists, zip(*per_part)):
+            found = [w for w in winners if w is not None]
+            best = slots[min(found, key=_rank)[0]] if found else None
+            if found and best is None:
+                # Compacted away while the batch ran
+                best = self.best(toks, category_filter)
+            result.append(best)
+        if not per_part:
+            result = [None] * len(token_lists)
+        return result
+
+
+def _impact_layers(contributions: Iterable[Tuple[int, int]]) -> Tuple[Layer, ...]:
+    """(points, entry ids in order) groups of (entry id, points) pairs in id order, most points first."""
+    groups: Dict[int, List[int]] = {}
+    for eid, points in contributions:
+        groups.setdefault(points, []).append(eid)
+    return tuple((points, tuple(groups[points])) for points in sorted(groups, reverse=True))
+
+def _rank(item: Tuple[int, int]) -> Tuple[int, int]:
+    # (entry id, score) → higher score first, then lower id
+    return -item[1], item[0]
+
+def _hit(tok: str, kw: str, synonym_sets: Dict[str, FrozenSet[str]]) -> int:
+    # Same rule as dean_logic.keyword_hit_score
+    if tok == kw:
+        return 3
+    syns = synonym_sets.get(kw, frozenset())
+    if tok in syns:
+        return 2
+    fuzzy = fuzzy_score(tok, kw, syns)
+    if kw in tok or tok in kw:
+        return max(fuzzy, 1)
+    return fuzzy
+
+def _fuzzy_hits(words: Iterable[str], keywords: Container[str],
+                synonym_of: Dict[str, Iterable[str]]) -> Dict[str, int]:
+    """{keyword: fuzzy points} for the words a token misspells (DeletionIndex.lookup)."""
+    hits: Dict[str, int] = {}
+    kw_points, syn_points = dean_fuzzy.keyword_points(), dean_fuzzy.synonym_points()
+    for word in words:
+        if word in keywords:
+            hits[word] = kw_points
+        for kw in synonym_of.get(word, ()):
+            if hits.get(kw, 0) < syn_points:
+                hits[kw] = syn_points
+    return {kw: sc for kw, sc in hits.items() if sc}
+
+def _patch_row(rows: Dict[str, Dict[int, int]], key: str, eid: int, delta: int) -> Optional[str]:
+    """Add delta to rows[key][eid] (copy-on-write); reports "added"/"removed" keys."""
+    old = rows.get(key)
+    row = dict(old) if old else {}
+    n = row.get(eid, 0) + delta
+    if n:
+        row[eid] = n
+    else:
+        row.pop(eid, None)
+    if row:
+        rows[key] = row
+        return "added" if old is None else None
+    if old is not None:
+        del rows[key]
+        return "removed"
+    return None
+
+def _patch_postings(plist: Tuple[Posting, ...], eid: int, d_kw: int, d_q: int) -> Tuple[Posting, ...]:
+    """New posting tuple with (d_kw, d_q) added to eid's posting."""
+    i = bisect.bisect_left(plist, (eid,))
+    if i < len(plist) and plist[i][0] == eid:
+        kw_sc, q_sc = plist[i][1] + d_kw, plist[i][2] + d_q
+        rest = plist[i + 1:]
+    else:
+        kw_sc, q_sc = d_kw, d_q
+        rest = plist[i:]
+    mid = ((eid, kw_sc, q_sc),) if kw_sc or q_sc else ()
+    return plist[:i] + mid + rest
@@ -62,9 +62,20 @@
 
 # faq_logic.py
 
-import re
-from typing import List, Optional, Tuple
-from dean_data import FAQEntry, KNOWLEDGE_BASE, SYNONYMS
+import threading
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Optional, Tuple
+import dean_data
+from dean_data import (
+    FAQEntry, SYNONYMS, SYNONYM_SETS, TOKEN_SPLIT, EntryFeatures, compile_entry,
+)
+from dean_cache import QueryCache, query_key
+from dean_fuzzy import fuzzy_score, max_edits
+from dean_metrics import METRICS
+from dean_index import CategoryFilter, KnowledgeIndex, normalize_categories
+from dean_suggest import SuggestionTrie
+
+if TYPE_CHECKING:
+    from dean_numpy import MatrixScorer
 
 # -------------------------
 # Helper: lowercase + tokenize
@@ -81,7 +92,7 @@ def tokenize(s: str) -> List[str]:
     - lowercase each token
     - ignore empty tokens
     """
-    tokens = re.split(r"[^A-Za-z0-9]+", s)
+    tokens = TOKEN_SPLIT.split(s)
     return [to_lowercase(t) for t in tokens if t]
 
 # -------------------------
@@ -96,45 +107,80 @@ def get_synonyms(keyword: str) -> List[str]:
 # Matching primitives
 # -------------------------
 
+_NO_SYNONYMS: FrozenSet[str] = frozenset()
+
 def keyword_hit_score(tok: str, kw: str) -> int:
     """
     Compute score for a token against a keyword:
     - exact keyword hit: 3 points
-    - synonym hit: 2 points
+    - synonym hit: 2 points (set lookup in SYNONYM_SETS)
     - substring match: 1 point
+    - misspelled keyword / synonym: 3 / 2 minus dean_fuzzy.FUZZY_PENALTY
+      (the better of this and the substring point)
     - otherwise: 0
     """
     if tok == kw:
         return 3
-    if tok in get_synonyms(kw):
+    syns = SYNONYM_SETS.get(kw, _NO_SYNONYMS)
+    if tok in syns:
         return 2
+    fuzzy = fuzzy_score(tok, kw, syns)
     if kw in tok or tok in kw:
-        return 1
-    return 0
+        return max(fuzzy, 1)
+    return fuzzy
+
+def count_phrase(seq: Tuple[str, ...], toks: List[str]) -> int:
+    """Number of (possibly overlapping) occurrences of a token sequence in toks."""
+    n = len(seq)
+    return sum(1 for i in range(len(toks) - n + 1) if tuple(toks[i:i + n]) == seq)
+
+def entry_features(f: FAQEntry) -> EntryFeatures:
+    """Return the precompiled features of an entry (compiled on the fly if missing)."""
+    return f.features if f.features is not None else compile_entry(f)
+
+def _typo_flags(toks: List[str]) -> List[bool]:
+    # Tokens long enough to be checked for misspellings
+    return [max_edits(len(tok)) > 0 for tok in toks]
+
+def _score_features(feats: EntryFeatures, toks: List[str], tok_set: Iterable[str], typos: List[bool]) -> int:
+    keyword_scores = 0
+    for kw, syns in zip(feats.keywords, feats.synonyms):
+        for tok, typo in zip(toks, typos):
+            if tok == kw:
+                keyword_scores += 3
+            elif tok in syns:
+                keyword_scores += 2
+            elif kw in tok or tok in kw:
+                keyword_scores += max(fuzzy_score(tok, kw, syns), 1) if typo else 1
+            elif typo:
+                keyword_scores += fuzzy_score(tok, kw, syns)
+
+    # Multi-word keywords/synonyms: points per occurrence of the whole phrase
+    for seq, points in feats.phrases:
+        keyword_scores += points * count_phrase(seq, toks)
+
+    common = sum(1 for t in feats.question_tokens if t in tok_set)
+
+    return keyword_scores + common
 
 def score_entry(f: FAQEntry, toks: List[str]) -> int:
     """
     Compute score for an FAQ entry given tokenized query:
     - sum of keyword hit scores
+    - plus phrase hits: 3 per occurrence of a multi-word keyword,
+      2 per occurrence of a multi-word synonym
     - plus number of common tokens with the FAQ question
     """
-    ks = [to_lowercase(k) for k in f.keywords]
-    keyword_scores = 0
-    for kw in ks:
-        for tok in toks:
-            keyword_scores += keyword_hit_score(tok, kw)
-
-    q_tokens = tokenize(f.question)
-    common = sum(1 for t in q_tokens if t in toks)
-
-    return keyword_scores + common
+    return _score_features(entry_features(f), toks, set(toks), _typo_flags(toks))
 
 def find_best(faqs: List[FAQEntry], toks: List[str]) -> Optional[FAQEntry]:
     """Find the FAQ entry with the highest score (ties → first encountered)."""
     best: Optional[FAQEntry] = None
     best_score = -1
+    tok_set = set(toks)
+    typos = _typo_flags(toks)
     for f in faqs:
-        sc = score_entry(f, toks)
+        sc = _score_features(entry_features(f), toks, tok_set, typos)
         if sc > best_score:
             best = f
             best_score = sc
@@ -144,28 +190,260 @@ def find_best(faqs: List[FAQEntry], toks: List[str]) -> Optional[FAQEntry]:
 # Public query function
 # -------------------------
 
-def process_query(q: str, category_filter: Optional[str] = None) -> Tuple[str, Optional[FAQEntry]]:
+NO_MATCH_ANSWER = "I'm sorry — I could not find a matching answer. Please rephrase your question or contact the Dean's office."
+
+# Results of process_query, keyed on the normalized tokens + category filter
+QUERY_CACHE = QueryCache(maxsize=4096)
+_NO_RESULT = object()
+
+# The live index: built on first use, once per process. score_entry and
+# find_best above stay as the reference implementation it must agree with.
+_INDEX: Optional[KnowledgeIndex] = None
+_INDEX_LOCK = threading.RLock()
+_GENERATION = 0
+
+def get_index() -> KnowledgeIndex:
+    """Return the live index, building it from dean_data on first use."""
+    index = _INDEX
+    if index is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                reload_knowledge_base()
+            index = _INDEX
+    return index
+
+def install_index(index: KnowledgeIndex) -> KnowledgeIndex:
+    """
+    Atomically make index the live one and invalidate the query cache.
+    Readers never lock: a query that already holds the previous index
+    finishes on it.
+    """
+    global _INDEX, _GENERATION
+    with _INDEX_LOCK:
+        _GENERATION += 1
+        index.generation = _GENERATION
+        _INDEX = index
+        QUERY_CACHE.invalidate()
+        return index
+
+def reload_knowledge_base(entries: Optional[List[FAQEntry]] = None,
+                          synonyms: Optional[Dict[str, List[str]]] = None) -> KnowledgeIndex:
+    """
+    Rebuild the index (default: from dean_data) and install it.
+    """
+    if entries is None and synonyms is None and dean_data.KB_INDEX_STATE is not None:
+        # Compiled snapshot: reuse its index instead of rebuilding
+        index = KnowledgeIndex.from_state(dean_data.KNOWLEDGE_BASE, dean_data.KB_INDEX_STATE)
+    else:
+        entries = dean_data.KNOWLEDGE_BASE if entries is None else entries
+        synonyms = dean_data.SYNONYMS if synonyms is None else synonyms
+        index = KnowledgeIndex(entries, synonyms)
+    return install_index(index)
+
+# -------------------------
+# Incremental updates of the live index
+# - each change is applied in place, then the generation is bumped and
+#   the query cache invalidated (same contract as install_index)
+# -------------------------
+
+def _touch(index: KnowledgeIndex) -> None:
+    global _GENERATION
+    _GENERATION += 1
+    index.generation = _GENERATION
+    QUERY_CACHE.invalidate()
+
+def add_entry(entry: FAQEntry) -> int:
+    """Add an entry to the live index; returns its id."""
+    with _INDEX_LOCK:
+        index = get_index()
+        eid = index.add(entry)
+        _touch(index)
+        return eid
+
+def update_entry(entry_id: int, entry: FAQEntry) -> None:
+    """Replace entry entry_id in the live index (keeps its tie-break position)."""
+    with _INDEX_LOCK:
+        index = get_index()
+        index.update(entry_id, entry)
+        _touch(index)
+
+def remove_entry(entry_id: int) -> None:
+    """Remove entry entry_id from the live index."""
+    with _INDEX_LOCK:
+        index = get_index()
+        index.remove(entry_id)
+        _touch(index)
+
+def compact_index() -> int:
+    """Purge removed entries from the live index now; returns how many."""
+    with _INDEX_LOCK:
+        return get_index().compact()
+
+# -------------------------
+# Scoring backends for process_query
+# - "index":  inverted index + query cache (default)
+# - "python": find_best over the entries, the reference
+# - "numpy":  dean_numpy.MatrixScorer, a sparse matrix product (needs numpy)
+# The non-default backends bypass the query cache, so they can be
+# compared and timed against each other.
+# -------------------------
+
+BACKENDS = ("index", "python", "numpy")
+
+_MATRIX: Optional["MatrixScorer"] = None
+
+def get_matrix_scorer() -> "MatrixScorer":
+    """The numpy scorer for the live index, rebuilt when the index changes."""
+    global _MATRIX
+    # Imported here: numpy is only loaded when the backend is used
+    from dean_numpy import MatrixScorer
+
+    index = get_index()
+    scorer = _MATRIX
+    if scorer is None or scorer.generation != index.generation:
+        with _INDEX_LOCK:
+            index = get_index()
+            scorer = MatrixScorer(index.entries)
+            scorer.generation = index.generation
+            _MATRIX = scorer
+    return scorer
+
+def _best_python(toks: List[str], category_filter: CategoryFilter) -> Optional[FAQEntry]:
+    index = get_index()
+    cats = normalize_categories(category_filter)
+    candidates = [f for f in index.entries if cats is None or f.cat in cats]
+    return find_best(candidates, toks)
+
+def process_query(q: str, category_filter: CategoryFilter = None,
+                  backend: str = "index") -> Tuple[str, Optional[FAQEntry]]:
     """
     Public query function:
     - preprocess query: lowercase + tokenize
-    - find best FAQ entry by score
-    - optional category filter
+    - find best FAQ entry by score (via the inverted index)
+    - optional category filter: one category or several
+    - backend: "index", "python" or "numpy" (see BACKENDS); same result
+    - stage timings go to dean_metrics.METRICS when it is enabled
     """
+    trace = METRICS.trace() if METRICS.enabled else None
     toks = tokenize(q)
-    candidates = [f for f in KNOWLEDGE_BASE if (category_filter is None or f.cat == category_filter)]
-    best = find_best(candidates, toks)
+    if trace is not None:
+        trace.lap("tokenize")
+
+    if backend != "index":
+        if backend == "python":
+            best = _best_python(toks, category_filter)
+        elif backend == "numpy":
+            best = get_matrix_scorer().best(toks, category_filter)
+        else:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+        if trace is not None:
+            trace.lap("score")
+            METRICS.record(f"query_{backend}", trace)
+        if best is None:
+            return NO_MATCH_ANSWER, None
+        return best.answer, best
+
+    # Generation first: a result from an index swapped out meanwhile is not cached
+    generation = QUERY_CACHE.generation
+    index = get_index()
+    key = query_key(toks, normalize_categories(category_filter), index.phrase_hits(toks))
+    best = QUERY_CACHE.get(key, _NO_RESULT)
+    if trace is not None:
+        trace.lap("cache")
+        METRICS.count("cache_hits" if best is not _NO_RESULT else "cache_misses")
+    if best is _NO_RESULT:
+        best = index.best(toks, category_filter, trace)
+        QUERY_CACHE.put(key, best, generation)
+    if trace is not None:
+        METRICS.record("query", trace)
     if best is None:
-        return "I'm sorry — I could not find a matching answer. Please rephrase your question or contact the Dean's office.", None
+        return NO_MATCH_ANSWER, None
     return best.answer, best
 
+def process_query_topk(q: str, k: int = 5, category_filter: CategoryFilter = None) -> List[Tuple[FAQEntry, int]]:
+    """
+    Ranked variant of process_query:
+    - returns up to k (entry, score) pairs, best first
+    - the first pair is the entry process_query would return
+    - ties → first encountered, as in find_best
+    """
+    trace = METRICS.trace() if METRICS.enabled else None
+    toks = tokenize(q)
+    if trace is None:
+        return get_index().topk(toks, k, category_filter)
+    trace.lap("tokenize")
+    ranked = get_index().topk(toks, k, category_filter, trace)
+    METRICS.record("topk", trace)
+    return ranked
+
+def process_queries(queries: List[str], category_filter: CategoryFilter = None) -> List[Tuple[str, Optional[FAQEntry]]]:
+    """
+    Batch variant of process_query (e.g. replaying a query log):
+    - same (answer, entry) per query as process_query
+    - all queries are scored together, term by term
+    """
+    bests = get_index().best_many([tokenize(q) for q in queries], category_filter)
+    return [(NO_MATCH_ANSWER, None) if best is None else (best.answer, best) for best in bests]
+
+# -------------------------
+# Type-ahead suggestions
+# - dean_suggest.SuggestionTrie over the live entries' questions,
+#   keywords and synonyms, rebuilt when the index changes
+# -------------------------
+
+_SUGGESTER: Optional[SuggestionTrie] = None
+
+def get_suggester() -> SuggestionTrie:
+    """The suggestion trie for the live index, rebuilt when the index changes."""
+    global _SUGGESTER
+    index = get_index()
+    trie = _SUGGESTER
+    if trie is None or trie.generation != index.generation:
+        with _INDEX_LOCK:
+            index = get_index()
+            trie = _SUGGESTER
+            if trie is None or trie.generation != index.generation:
+                trie = SuggestionTrie.from_entries(index.entries, index.synonym_sets)
+                trie.generation = index.generation
+                _SUGGESTER = trie
+    return trie
+
+def suggest(prefix: str, n: int = 5) -> List[str]:
+    """
+    Up to n completions of partially typed text, best first:
+    - FAQ questions, keywords and synonyms starting with it
+    - then the text with its last word completed
+    """
+    trace = METRICS.trace() if METRICS.enabled else None
+    out = get_suggester().suggest(prefix, n)
+    if trace is not None:
+        trace.lap("suggest")
+        METRICS.record("suggest", trace)
+    return out
+
 # -------------------------
 # Utilities
 # -------------------------
 
 def get_all_questions() -> List[str]:
     """Return all FAQ questions."""
-    return [f.question for f in KNOWLEDGE_BASE]
+    return [f.question for f in get_index().entries]
 
 def total_faqs() -> int:
     """Return total number of FAQs."""
-    return len(KNOWLEDGE_BASE)
+    return len(get_index().entries)
+
+def browse_faqs(page: int = 0, page_size: int = 10, category_filter: CategoryFilter = None,
+                query: str = "") -> Tuple[List[FAQEntry], int]:
+    """
+    One page of FAQs for browsing, plus the total number of matches:
+    - no query: entries of the filtered categories, in knowledge base order
+    - with a query: entries with a non-zero score, best first
+    """
+    index = get_index()
+    if query.strip():
+        ids = [eid for eid, _ in index.matching(tokenize(query), category_filter)]
+    else:
+        ids = index.entry_ids(category_filter)
+    start = max(page, 0) * page_size
+    return index.entries_of(ids[start:start + page_size]), len(ids)
@@ -0,0 +1,263 @@
+# dean_metrics.py
+
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# -------------------------
+# Opt-in instrumentation for the query path
+# - off by default: dean_logic checks METRICS.enabled once per query and
+#   does nothing else when it is False
+# - on (enable() or DEANS_FAQ_METRICS=1): per-stage timings (tokenize,
+#   cache, filter, score, select, ...), entries scored and cache hits go
+#   into fixed-bucket histograms and counters
+# - output: to_json() or to_prometheus() (text exposition format)
+# - SamplingProfiler: periodic stack samples of the serving threads
+# -------------------------
+
+# Histogram bucket upper bounds (seconds for timings): 1-2.5-5 steps from 1 us to 10 s
+TIME_BUCKETS: Tuple[float, ...] = tuple(
+    m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)
+) + (10.0,)
+# Bucket upper bounds for counts (entries scored per query)
+COUNT_BUCKETS: Tuple[float, ...] = tuple(
+    m * 10 ** e for e in range(0, 6) for m in (1, 2.5, 5)
+)
+
+class Histogram:
+    """Fixed-bucket histogram: O(log buckets) per observation, no per-value storage."""
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: above every bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (0 if empty)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.50),
+            "p99": self.quantile(0.99),
+            "buckets": {str(b): n for b, n in zip(self.bounds, self.counts) if n},
+            "overflow": self.counts[-1],
+        }
+
+class QueryTrace:
+    """
+    Stage timer for one query: lap(stage) charges the time since the
+    previous lap to stage. Created only while metrics are enabled.
+    """
+
+    __slots__ = ("stages", "scored", "_start", "_last")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.scored = 0
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+    def total(self) -> float:
+        return self._last - self._start
+
+class Metrics:
+    """Registry of stage histograms and counters."""
+
+    def __init__(self, prefix: str = "deans_faq"):
+        self.prefix = prefix
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages: Dict[Tuple[str, str], Histogram] = {}
+            self.scored: Dict[str, Histogram] = {}
+            self.counters: Counter = Counter()
+
+    def enable(self, on: bool = True) -> None:
+        self.enabled = on
+
+    def trace(self) -> Optional[QueryTrace]:
+        """A new trace if enabled, else None (the only cost when disabled)."""
+        return QueryTrace() if self.enabled else None
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += n
+
+    def record(self, op: str, trace: QueryTrace) -> None:
+        """Fold a finished trace of operation op into the histograms."""
+        with self._lock:
+            for stage, seconds in trace.stages.items():
+                self._histogram(op, stage).observe(seconds)
+            self._histogram(op, "total").observe(trace.total())
+            h = self.scored.get(op)
+            if h is None:
+                h = self.scored[op] = Histogram(COUNT_BUCKETS)
+            h.observe(trace.scored)
+            self.counters[f"{op}_total"] += 1
+
+    def observe(self, op: str, stage: str, seconds: float) -> None:
+        """Record a single timing outside a trace (e.g. a UI render)."""
+        if self.enabled:
+            with self._lock:
+                self._histogram(op, stage).observe(seconds)
+
+    def _histogram(self, op: str, stage: str) -> Histogram:
+        h = self.stages.get((op, stage))
+        if h is None:
+            h = self.stages[(op, stage)] = Histogram(TIME_BUCKETS)
+        return h
+
+    # -------------------------
+    # Output
+    # -------------------------
+
+    def to_json(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "stage_seconds": {f"{op}.{stage}": h.to_json() for (op, stage), h in sorted(self.stages.items())},
+                "entries_scored": {op: h.to_json() for op, h in sorted(self.scored.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def dumps(self) -> str:
+        return json.dumps(self.to_json(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (cumulative buckets)."""
+        p = self.prefix
+        lines: List[str] = []
+        with self._lock:
+            if self.stages:
+                lines += [f"# HELP {p}_stage_seconds Time spent per query stage.",
+                          f"# TYPE {p}_stage_seconds histogram"]
+                for (op, stage), h in sorted(self.stages.items()):
+                    lines += _prometheus_histogram(f"{p}_stage_seconds", f'op="{op}",stage="{stage}"', h)
+            if self.scored:
+                lines += [f"# HELP {p}_entries_scored Entries fully scored per query (after pruning).",
+                          f"# TYPE {p}_entries_scored histogram"]
+                for op, h in sorted(self.scored.items()):
+                    lines += _prometheus_histogram(f"{p}_entries_scored", f'op="{op}"', h)
+            for name, n in sorted(self.counters.items()):
+                metric = f"{p}_{name}" if name.endswith("_total") else f"{p}_{name}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {n}"]
+        return "\n".join(lines) + "\n"
+
+def _prometheus_histogram(name: str, labels: str, h: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, n in zip(h.bounds, h.counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+    lines.append(f"{name}_sum{{{labels}}} {h.sum!r}")
+    lines.append(f"{name}_count{{{labels}}} {h.count}")
+    return lines
+
+METRICS = Metrics()
+if os.environ.get("DEANS_FAQ_METRICS", "") not in ("", "0"):
+    METRICS.enable()
+
+# -------------------------
+# Sampling profiler
+# -------------------------
+
+Stack = Tuple[str, ...]
+
+class SamplingProfiler:
+    """
+    Every interval seconds, records the Python stack of every other
+    thread (sys._current_frames). Costs nothing in the sampled threads;
+    the sampler thread does the work.
+
+    sink: optional hook called with {thread id: stack} for each sample
+    (e.g. to forward to an external profiler); samples are also counted
+    and available as collapsed stacks (flamegraph.pl / speedscope input).
+    """
+
+    def __init__(self, interval: float = 0.005, sink: Optional[Callable[[Dict[int, Stack]], None]] = None,
+                 max_depth: int = 64):
+        self.interval = interval
+        self.sink = sink
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="faq-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks: Dict[int, Stack] = {}
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks[tid] = tuple(reversed(stack))
+            for stack in stacks.values():
+                self.samples[stack] += 1
+            if self.sink is not None:
+                self.sink(stacks)
+
+    def collapsed(self) -> str:
+        """One line per distinct stack: "root;...;leaf count"."""
+        return "\n".join(f"{';'.join(stack)} {n}" for stack, n in self.samples.most_common()) + "\n"
+
+    def top(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Functions most often on top of the stack (self time)."""
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            if stack:
+                leaves[stack[-1]] += count
+        return leaves.most_common(n)
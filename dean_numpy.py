@@ -0,0 +1,162 @@
+# dean_numpy.py
+
+from typing import Dict, List, Optional, Sequence, Tuple
+from dean_data import FAQEntry, compile_entry
+from dean_fuzzy import DeletionIndex
+from dean_index import CategoryFilter, Phrase, PhraseMatcher, SubstringIndex, _fuzzy_hits, normalize_categories
+
+try:
+    import numpy as np
+except ImportError:  # optional: only needed when this backend is selected
+    np = None
+
+# -------------------------
+# Vectorized scoring backend (optional, needs numpy)
+# - entries are rows of a sparse integer feature matrix, stored column by
+#   column (CSC): one column per keyword, question token and phrase
+# - a query becomes a sparse weight vector over those columns:
+#   keyword column = 3/2/1 (exact/synonym/substring, or a misspelling: see
+#   dean_fuzzy) × count in query,
+#   question column = 1 if the token occurs, phrase column = occurrences
+# - scores = matrix · weights, best = argmax (first index on ties)
+# -------------------------
+
+def available() -> bool:
+    """True if numpy can be imported."""
+    return np is not None
+
+class MatrixScorer:
+    """
+    Scores every entry of a knowledge base with one sparse product.
+    Results match dean_logic.find_best over the same entries exactly.
+    """
+
+    def __init__(self, entries: Sequence[FAQEntry]):
+        if np is None:
+            raise ImportError("the numpy backend needs numpy (pip install numpy)")
+        self.entries: List[FAQEntry] = list(entries)
+        # Generation of the index it was built from (see dean_logic.get_matrix_scorer)
+        self.generation = 0
+
+        # column -> {row: value}
+        keyword_cols: Dict[str, Dict[int, int]] = {}
+        question_cols: Dict[str, Dict[int, int]] = {}
+        phrase_cols: Dict[Phrase, Dict[int, int]] = {}
+        synonym_sets: Dict[str, frozenset] = {}
+        categories: Dict[str, List[int]] = {}
+        for row, f in enumerate(self.entries):
+            feats = f.features if f.features is not None else compile_entry(f)
+            for kw, syns in zip(feats.keywords, feats.synonyms):
+                col = keyword_cols.setdefault(kw, {})
+                col[row] = col.get(row, 0) + 1
+                synonym_sets[kw] = syns
+            for t in feats.question_tokens:
+                col = question_cols.setdefault(t, {})
+                col[row] = col.get(row, 0) + 1
+            for phrase, points in feats.phrases:
+                col = phrase_cols.setdefault(phrase, {})
+                col[row] = col.get(row, 0) + points
+            categories.setdefault(f.cat, []).append(row)
+
+        # Column ids: keywords, then question tokens, then phrases
+        self._keyword_col = {kw: i for i, kw in enumerate(keyword_cols)}
+        base = len(self._keyword_col)
+        self._question_col = {t: base + i for i, t in enumerate(question_cols)}
+        base += len(self._question_col)
+        self._phrase_col = {p: base + i for i, p in enumerate(phrase_cols)}
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        for cols in (keyword_cols, question_cols, phrase_cols):
+            for col in cols.values():
+                for row in sorted(col):
+                    indices.append(row)
+                    data.append(col[row])
+                indptr.append(len(indices))
+        self._indptr = np.array(indptr, dtype=np.int64)
+        self._indices = np.array(indices, dtype=np.int64)
+        self._data = np.array(data, dtype=np.int64)
+
+        # Keyword resolution, as in PartitionIndex.keyword_hits
+        self._substrings = SubstringIndex(keyword_cols)
+        synonym_of: Dict[str, List[str]] = {}
+        for kw, syns in synonym_sets.items():
+            for s in syns:
+                synonym_of.setdefault(s, []).append(kw)
+        self._synonym_of = synonym_of
+        self._fuzzy = DeletionIndex([*keyword_cols, *synonym_of])
+        self._phrases = PhraseMatcher(phrase_cols)
+
+        n = len(self.entries)
+        self._masks: Dict[str, "np.ndarray"] = {}
+        for cat, rows in categories.items():
+            mask = np.zeros(n, dtype=bool)
+            mask[rows] = True
+            self._masks[cat] = mask
+
+    def _weights(self, toks: List[str]) -> List[Tuple[int, int]]:
+        """The query as (column, weight) pairs."""
+        weights: Dict[int, int] = {}
+        counts: Dict[str, int] = {}
+        for tok in toks:
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, n in counts.items():
+            hits = _fuzzy_hits(self._fuzzy.lookup(tok), self._keyword_col, self._synonym_of)
+            for kw in self._substrings.matches(tok):
+                hits[kw] = max(hits.get(kw, 0), 1)
+            for kw in self._synonym_of.get(tok, ()):
+                hits[kw] = 2
+            if tok in self._keyword_col:
+                hits[tok] = 3
+            for kw, sc in hits.items():
+                col = self._keyword_col[kw]
+                weights[col] = weights.get(col, 0) + sc * n
+            col = self._question_col.get(tok)
+            if col is not None:
+                weights[col] = 1
+        if self._phrases:
+            for phrase in self._phrases.find(toks):
+                col = self._phrase_col[phrase]
+                weights[col] = weights.get(col, 0) + 1
+        return list(weights.items())
+
+    def scores(self, toks: List[str]) -> "np.ndarray":
+        """Score of every entry (int64 vector, one slot per row)."""
+        n = len(self.entries)
+        weights = self._weights(toks)
+        if not weights:
+            return np.zeros(n, dtype=np.int64)
+        cols = np.array([c for c, _ in weights], dtype=np.int64)
+        w = np.array([x for _, x in weights], dtype=np.int64)
+        starts, ends = self._indptr[cols], self._indptr[cols + 1]
+        lengths = ends - starts
+        # Positions of every non-zero of the selected columns in indices/data
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = self._indices[offsets]
+        vals = self._data[offsets] * np.repeat(w, lengths)
+        # Scores are small integers: float64 sums in bincount stay exact.
+        return np.bincount(rows, weights=vals, minlength=n).astype(np.int64)
+
+    def _mask(self, category_filter: CategoryFilter) -> Optional["np.ndarray"]:
+        cats = normalize_categories(category_filter)
+        if cats is None:
+            return None
+        mask = np.zeros(len(self.entries), dtype=bool)
+        for c in cats:
+            if c in self._masks:
+                mask |= self._masks[c]
+        return mask
+
+    def best(self, toks: List[str], category_filter: CategoryFilter = None) -> Optional[FAQEntry]:
+        """Same result as find_best over the (filtered) entries."""
+        scores = self.scores(toks)
+        mask = self._mask(category_filter)
+        if mask is not None:
+            if not mask.any():
+                return None
+            scores = np.where(mask, scores, -1)
+        if not len(scores):
+            return None
+        # argmax returns the first maximum: ties → first entry, as in find_best
+        return self.entries[int(np.argmax(scores))]
@@ -0,0 +1,347 @@
+# dean_querylog.py
+
+import argparse
+import gzip
+import json
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from dean_data import FAQEntry
+from dean_logic import get_index, process_query, score_entry, tokenize
+
+# -------------------------
+# Query-log analytics
+# - log: JSON lines, one query per line: {"q": "...", "category": ...}
+#   (category optional: a name or a list; --field picks another text
+#   field); "-" reads stdin, *.gz is decompressed on the fly
+# - generator stages, one line at a time:
+#   read_lines -> parse -> normalize (tokenize) -> score (process_query)
+#   -> summarize (LogSummary)
+# - memory is bounded by the summary (fixed-size frequent-query tables,
+#   score histograms), not by the size of the log
+# - workers > 1: chunks of raw lines go to a process pool that runs
+#   parse..summarize on each; the partial summaries are merged in order
+# -------------------------
+
+QUERY_FIELD = "q"
+CATEGORY_FIELD = "category"
+# A best match scoring less than one exact keyword hit is "low score"
+LOW_SCORE = 3
+# Queries tracked per frequent-query table
+CAPACITY = 1000
+CHUNK_LINES = 5000
+NO_MATCH = "(no match)"
+
+class LogRecord(NamedTuple):
+    query: str
+    categories: Optional[Tuple[str, ...]]
+
+class NormalizedQuery(NamedTuple):
+    query: str
+    categories: Optional[Tuple[str, ...]]
+    toks: List[str]
+    key: str  # normalized text: the tokens joined by spaces
+
+class ScoredQuery(NamedTuple):
+    key: str
+    entry: Optional[FAQEntry]
+    score: int
+
+# -------------------------
+# Bounded-memory summaries
+# -------------------------
+
+class TopCounter:
+    """
+    Approximate counts of the most frequent keys in bounded memory.
+
+    At most 2 * capacity keys are held; beyond that the table is cut back
+    to the capacity most counted ones and the largest dropped count
+    becomes the floor every key seen later starts from. Counts are upper
+    bounds: count - error <= true count <= count.
+    """
+
+    def __init__(self, capacity: int = CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.floor = 0
+
+    def add(self, key: str, n: int = 1) -> None:
+        counts = self.counts
+        if key in counts:
+            counts[key] += n
+            return
+        counts[key] = self.floor + n
+        self.errors[key] = self.floor
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def merge(self, other: "TopCounter") -> None:
+        """Add another table's counts (e.g. a worker's, over other lines)."""
+        counts, errors = self.counts, self.errors
+        for key in counts:
+            if key not in other.counts:
+                counts[key] += other.floor
+                errors[key] += other.floor
+        for key, n in other.counts.items():
+            if key in counts:
+                counts[key] += n
+                errors[key] += other.errors[key]
+            else:
+                counts[key] = n + self.floor
+                errors[key] = other.errors[key] + self.floor
+        self.floor += other.floor
+        if len(counts) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self) -> None:
+        ranked = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        self.floor = max(self.floor, ranked[self.capacity][1])
+        self.counts = dict(ranked[:self.capacity])
+        self.errors = {key: self.errors[key] for key in self.counts}
+
+    def most_common(self, n: int) -> List[Tuple[str, int, int]]:
+        """(key, count, error) of the n most counted keys."""
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+class LogSummary:
+    """
+    Everything reported about a log:
+    - lines read, malformed lines, queries scored
+    - most frequent queries, no-match queries (score 0 or nothing in the
+      filtered categories) and low-score queries (below low_score)
+    - traffic and score histogram per category of the best match
+    """
+
+    def __init__(self, capacity: int = CAPACITY, low_score: int = LOW_SCORE):
+        self.low_score_below = low_score
+        self.lines = 0
+        self.malformed = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.top = TopCounter(capacity)
+        self.no_match = TopCounter(capacity)
+        self.low_score = TopCounter(capacity)
+        self.scores: Dict[str, Counter] = {}
+
+    def add(self, q: ScoredQuery) -> None:
+        self.queries += 1
+        self.top.add(q.key)
+        if q.entry is None or q.score == 0:
+            self.no_match.add(q.key)
+            cat = NO_MATCH
+        else:
+            if q.score < self.low_score_below:
+                self.low_score.add(q.key)
+            cat = q.entry.cat
+        hist = self.scores.get(cat)
+        if hist is None:
+            hist = self.scores[cat] = Counter()
+        hist[q.score] += 1
+
+    def merge(self, other: "LogSummary") -> None:
+        self.lines += other.lines
+        self.malformed += other.malformed
+        self.queries += other.queries
+        self.top.merge(other.top)
+        self.no_match.merge(other.no_match)
+        self.low_score.merge(other.low_score)
+        for cat, hist in other.scores.items():
+            self.scores.setdefault(cat, Counter()).update(hist)
+
+    def lines_per_second(self) -> float:
+        return self.lines / self.seconds if self.seconds > 0 else 0.0
+
+    def report(self, n: int = 20) -> Dict[str, Any]:
+        """Plain-data report: the n most frequent queries of each table."""
+        def table(counter: TopCounter) -> List[Dict[str, Any]]:
+            return [{"query": key, "count": count, "error": error}
+                    for key, count, error in counter.most_common(n)]
+
+        categories = {}
+        for cat, hist in sorted(self.scores.items(), key=lambda kv: -sum(kv[1].values())):
+            total = sum(hist.values())
+            categories[cat] = {
+                "queries": total,
+                "share": total / self.queries if self.queries else 0.0,
+                "mean_score": sum(sc * k for sc, k in hist.items()) / total,
+                "p50": _quantile(hist, 0.50),
+                "p90": _quantile(hist, 0.90),
+                "p99": _quantile(hist, 0.99),
+                "histogram": {str(sc): hist[sc] for sc in sorted(hist)},
+            }
+        return {
+            "lines": self.lines,
+            "malformed": self.malformed,
+            "queries": self.queries,
+            "seconds": self.seconds,
+            "lines_per_second": self.lines_per_second(),
+            "top_queries": table(self.top),
+            "no_match": table(self.no_match),
+            "low_score": table(self.low_score),
+            "low_score_below": self.low_score_below,
+            "categories": categories,
+        }
+
+def _quantile(hist: Counter, q: float) -> int:
+    rank = q * sum(hist.values())
+    seen = 0
+    for sc in sorted(hist):
+        seen += hist[sc]
+        if seen >= rank:
+            return sc
+    return max(hist)
+
+# -------------------------
+# Stages
+# -------------------------
+
+def read_lines(paths: Iterable[str]) -> Iterator[str]:
+    """Lines of each log in turn ("-": stdin, *.gz: gzip)."""
+    for path in paths:
+        if path == "-":
+            yield from sys.stdin
+        elif path.endswith(".gz"):
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                yield from fh
+        else:
+            with open(path, encoding="utf-8") as fh:
+                yield from fh
+
+def parse(lines: Iterable[str], summary: LogSummary, field: str = QUERY_FIELD) -> Iterator[LogRecord]:
+    """Log records; blank lines are skipped, unusable ones counted as malformed."""
+    for line in lines:
+        summary.lines += 1
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            summary.malformed += 1
+            continue
+        if isinstance(obj, str):
+            yield LogRecord(obj, None)
+            continue
+        query = obj.get(field) if isinstance(obj, dict) else None
+        if not isinstance(query, str):
+            summary.malformed += 1
+            continue
+        cats = obj.get(CATEGORY_FIELD)
+        if isinstance(cats, str):
+            cats = (cats,)
+        elif isinstance(cats, list) and cats:
+            cats = tuple(c for c in cats if isinstance(c, str))
+        else:
+            cats = None
+        yield LogRecord(query, cats)
+
+def normalize(records: Iterable[LogRecord]) -> Iterator[NormalizedQuery]:
+    for r in records:
+        toks = tokenize(r.query)
+        yield NormalizedQuery(r.query, r.categories, toks, " ".join(toks))
+
+def score(queries: Iterable[NormalizedQuery]) -> Iterator[ScoredQuery]:
+    """Best match via process_query (and its cache), plus that match's score."""
+    for q in queries:
+        _, best = process_query(q.query, q.categories)
+        yield ScoredQuery(q.key, best, score_entry(best, q.toks) if best is not None else 0)
+
+def summarize(scored: Iterable[ScoredQuery], summary: LogSummary) -> LogSummary:
+    for q in scored:
+        summary.add(q)
+    return summary
+
+def chunks(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    chunk: List[str] = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# -------------------------
+# Pipeline
+# -------------------------
+
+def _warm_up() -> None:
+    # Build the index when a pool process starts, not on its first chunk
+    get_index()
+
+def summarize_lines(lines: Iterable[str], field: str = QUERY_FIELD, capacity: int = CAPACITY,
+                    low_score: int = LOW_SCORE) -> LogSummary:
+    """All stages over some lines, in this process (a pool worker's unit of work)."""
+    summary = LogSummary(capacity, low_score)
+    return summarize(score(normalize(parse(lines, summary, field))), summary)
+
+def analyze(paths: Iterable[str], field: str = QUERY_FIELD, workers: int = 1,
+            capacity: int = CAPACITY, low_score: int = LOW_SCORE,
+            chunk_lines: int = CHUNK_LINES) -> LogSummary:
+    """
+    Summarize query logs in constant memory:
+    - workers <= 1: one generator pipeline in this process
+    - workers > 1: chunk_lines-line chunks scored in a process pool, at
+      most 2 * workers chunks in flight
+    """
+    get_index()  # built once here (not timed); forked workers inherit it
+    start = time.perf_counter()
+    lines = read_lines(paths)
+    if workers <= 1:
+        summary = summarize_lines(lines, field, capacity, low_score)
+    else:
+        summary = LogSummary(capacity, low_score)
+        with ProcessPoolExecutor(workers, initializer=_warm_up) as pool:
+            pending: deque = deque()
+            for chunk in chunks(lines, chunk_lines):
+                pending.append(pool.submit(summarize_lines, chunk, field, capacity, low_score))
+                if len(pending) >= 2 * workers:
+                    summary.merge(pending.popleft().result())
+            while pending:
+                summary.merge(pending.popleft().result())
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+def format_report(report: Dict[str, Any]) -> str:
+    out = [
+        f"{report['lines']} lines, {report['queries']} queries, {report['malformed']} malformed "
+        f"in {report['seconds']:.1f} s ({report['lines_per_second']:.0f} lines/s)",
+    ]
+    for title, name in (("Top queries", "top_queries"), ("No match", "no_match"),
+                        (f"Low score (< {report['low_score_below']})", "low_score")):
+        out.append(f"\n{title}:")
+        for row in report[name]:
+            approx = f" (±{row['error']})" if row["error"] else ""
+            out.append(f"  {row['count']:>9}{approx}  {row['query'] or '(empty)'}")
+    out.append("\nCategories (of the best match):")
+    out.append(f"  {'category':<24} {'queries':>9} {'share':>6} {'mean':>6} {'p50':>4} {'p90':>4} {'p99':>4}")
+    for cat, c in report["categories"].items():
+        out.append(f"  {cat:<24} {c['queries']:>9} {c['share']:>6.1%} {c['mean_score']:>6.2f} "
+                   f"{c['p50']:>4} {c['p90']:>4} {c['p99']:>4}")
+    return "\n".join(out)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Summarize JSONL query logs.")
+    ap.add_argument("logs", nargs="+", help="JSONL query logs (*.gz allowed, '-' for stdin)")
+    ap.add_argument("--field", default=QUERY_FIELD, help="JSON field holding the query text")
+    ap.add_argument("--workers", type=int, default=1, help="processes scoring in parallel")
+    ap.add_argument("--top", type=int, default=20, help="queries listed per table")
+    ap.add_argument("--low-score", type=int, default=LOW_SCORE)
+    ap.add_argument("--capacity", type=int, default=CAPACITY, help="queries tracked per table")
+    ap.add_argument("--json", help="also write the report here as JSON")
+    args = ap.parse_args(argv)
+
+    summary = analyze(args.logs, args.field, args.workers, args.capacity, args.low_score)
+    report = summary.report(args.top)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# dean_reload.py
+
+import os
+import runpy
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import dean_data
+import dean_logic
+from dean_index import KnowledgeIndex
+
+# -------------------------
+# Hot reload of the knowledge base
+# - a background thread polls the source file (mtime + size)
+# - on change, a new KnowledgeIndex is built off the request path
+# - dean_logic.install_index swaps it in; queries never take a lock and
+#   in-flight ones finish on the index they started with
+# -------------------------
+
+def default_source() -> str:
+    """DEANS_FAQ_KB if set, otherwise dean_data.py itself."""
+    return dean_data.KB_SOURCE or os.path.abspath(dean_data.__file__)
+
+def build_index(path: str) -> KnowledgeIndex:
+    """Build a fresh index from a knowledge base source file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".py":
+        # A dean_data-style module: run it in a fresh namespace, then
+        # rebuild its entries as dean_data.FAQEntry (the run defines its
+        # own FAQEntry class, which would not compare or pickle as ours)
+        ns = runpy.run_path(path)
+        entries = [dean_data.FAQEntry(f.question, f.answer, f.keywords, f.cat) for f in ns["KNOWLEDGE_BASE"]]
+        synonyms = ns["SYNONYMS"]
+        dean_data.compile_knowledge_base(entries, synonyms)
+        return KnowledgeIndex(entries, synonyms)
+    if ext == ".thy":
+        from dean_data import compile_knowledge_base
+        from faq_thy import parse_thy
+        with open(path, encoding="utf-8") as fh:
+            entries, synonyms, _ = parse_thy(fh.read())
+        compile_knowledge_base(entries, synonyms)
+        return KnowledgeIndex(entries, synonyms)
+
+    from dean_store import load_knowledge_base
+    kb = load_knowledge_base(path)
+    if kb.index_state is not None:
+        return KnowledgeIndex.from_state(kb.entries, kb.index_state)
+    return KnowledgeIndex(kb.entries, kb.synonyms)
+
+class KnowledgeReloader:
+    """
+    Watches a knowledge base source and installs a new index when it changes.
+
+    A failed rebuild (e.g. a half-written file) keeps the current index
+    serving; the error is kept in last_error and retried on the next change.
+    """
+
+    def __init__(self, path: Optional[str] = None, interval: float = 2.0):
+        self.path = path or default_source()
+        self.interval = interval
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # counters
+        self.reloads = 0
+        self.failures = 0
+        self.last_duration_ms = 0.0
+        self.total_duration_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def start(self) -> "KnowledgeReloader":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="kb-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self) -> bool:
+        """Reload if the source changed since the last check; True if a new index went live."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        return self.reload_now()
+
+    def reload_now(self) -> bool:
+        """Rebuild from the source and install the result."""
+        with self._lock:
+            start = time.perf_counter()
+            try:
+                index = build_index(self.path)
+            except Exception as exc:  # keep serving the current index
+                self.failures += 1
+                self.last_error = f"{type(exc).__name__}: {exc}"
+                return False
+            dean_logic.install_index(index)
+            self.last_duration_ms = (time.perf_counter() - start) * 1000
+            self.total_duration_ms += self.last_duration_ms
+            self.reloads += 1
+            self.last_error = None
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "source": self.path,
+            "generation": dean_logic.get_index().generation,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_reload_ms": round(self.last_duration_ms, 3),
+            "total_reload_ms": round(self.total_duration_ms, 3),
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,518 @@
+# dean_server.py
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from dean_data import FAQEntry
+from dean_index import normalize_categories
+from dean_metrics import METRICS
+from dean_suggest import TOP_N
+from dean_logic import (
+    BACKENDS, browse_faqs, get_index, process_queries, process_query, process_query_topk, suggest, tokenize,
+)
+
+# -------------------------
+# HTTP JSON API on top of dean_logic
+# - GET or POST (JSON body) for every endpoint:
+#     /query        q, category, backend  -> best answer
+#     /query/batch  queries, category     -> one best answer per query
+#     /topk         q, k, category        -> k best (entry, score)
+#     /faqs         page, page_size, category, q -> browse_faqs page
+#     /suggest      q, n                   -> type-ahead completions
+#     /metrics      format=prometheus|json -> dean_metrics.METRICS (--metrics)
+# - category: one name, several (repeated parameter or JSON list), or none
+# - HTTP/1.1 keep-alive; scoring runs in a thread or process pool;
+#   identical requests in flight at the same time are scored once
+# -------------------------
+
+MAX_BODY = 1 << 20
+MAX_BATCH = 10000
+MAX_K = 100
+MAX_SUGGESTIONS = TOP_N
+KEEPALIVE_TIMEOUT = 15.0
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+# -------------------------
+# Work functions (module level so a process pool can pickle them;
+# they return plain JSON-ready data)
+# -------------------------
+
+def entry_json(f: Optional[FAQEntry]) -> Optional[Dict[str, Any]]:
+    if f is None:
+        return None
+    return {"question": f.question, "answer": f.answer, "category": f.cat, "keywords": list(f.keywords)}
+
+def _answer_json(answer: str, best: Optional[FAQEntry]) -> Dict[str, Any]:
+    return {"answer": answer, "matched": best is not None, "entry": entry_json(best)}
+
+def run_query(q: str, categories: Optional[Tuple[str, ...]], backend: str) -> Dict[str, Any]:
+    return _answer_json(*process_query(q, categories, backend))
+
+def run_batch(queries: List[str], categories: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    return [_answer_json(answer, best) for answer, best in process_queries(queries, categories)]
+
+def run_topk(q: str, k: int, categories: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    return [dict(entry_json(f), score=sc) for f, sc in process_query_topk(q, k, categories)]
+
+def run_faqs(page: int, page_size: int, categories: Optional[Tuple[str, ...]], query: str) -> Dict[str, Any]:
+    entries, total = browse_faqs(page, page_size, categories, query)
+    return {"page": page, "page_size": page_size, "total": total, "items": [entry_json(f) for f in entries]}
+
+def _warm_up() -> None:
+    # Build the index when a pool process starts, not on its first request
+    get_index()
+
+# -------------------------
+# Request parameters
+# -------------------------
+
+class Params:
+    """Query-string and JSON-body parameters of one request."""
+
+    def __init__(self, query: Dict[str, List[str]], body: Dict[str, Any]):
+        self._query = query
+        self._body = body
+
+    def get(self, name: str, default: Any = None) -> Any:
+        if name in self._body:
+            return self._body[name]
+        values = self._query.get(name)
+        return values[-1] if values else default
+
+    def text(self, name: str, default: Optional[str] = None) -> str:
+        value = self.get(name, default)
+        if not isinstance(value, str):
+            raise HTTPError(400, f"'{name}' is required and must be a string")
+        return value
+
+    def integer(self, name: str, default: int, low: int, high: int) -> int:
+        value = self.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"'{name}' must be an integer") from None
+        if not low <= value <= high:
+            raise HTTPError(400, f"'{name}' must be between {low} and {high}")
+        return value
+
+    def categories(self) -> Optional[Tuple[str, ...]]:
+        if "category" in self._body:
+            value = self._body["category"]
+            if value is None or isinstance(value, str):
+                return normalize_categories(value)
+            if isinstance(value, list) and all(isinstance(c, str) for c in value):
+                return normalize_categories(value)
+            raise HTTPError(400, "'category' must be a string or a list of strings")
+        values = self._query.get("category")
+        return normalize_categories(values) if values else None
+
+# -------------------------
+# Server
+# -------------------------
+
+class FAQServer:
+    """
+    asyncio HTTP/1.1 server for the FAQ engine.
+
+    pool="thread" shares the process's index (and its hot reloads) with
+    every request; pool="process" scores in separate processes, each with
+    its own index, which sidesteps the GIL.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, pool: str = "thread",
+                 pool_size: int = 4, keepalive: float = KEEPALIVE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        if pool == "thread":
+            self.executor: Executor = ThreadPoolExecutor(pool_size, thread_name_prefix="faq-score")
+        elif pool == "process":
+            self.executor = ProcessPoolExecutor(pool_size, initializer=_warm_up)
+        else:
+            raise ValueError(f"Unknown pool {pool!r}; expected 'thread' or 'process'")
+        self.pool = pool
+        self.pool_size = pool_size
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._routes: Dict[str, Callable[[Params], Awaitable[Any]]] = {
+            "/query": self._query,
+            "/query/batch": self._batch,
+            "/topk": self._topk,
+            "/faqs": self._faqs,
+            "/suggest": self._suggest,
+            "/metrics": self._metrics,
+        }
+        # counters
+        self.requests = 0
+        self.coalesced = 0
+        self.connections = 0
+
+    async def start(self, sock=None) -> asyncio.AbstractServer:
+        """Start listening (on sock if given, e.g. one inherited from a pre-fork parent)."""
+        get_index()
+        if self.pool == "process":
+            # Fork every pool process now, before the server opens any
+            # socket: one forked lazily on a later request would inherit
+            # the open client connections (and the listening socket) and
+            # keep them open after the server closes its end.
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.pool_size)))
+        if sock is not None:
+            self._server = await asyncio.start_server(self._handle, sock=sock)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self, sock=None) -> None:
+        server = await self.start(sock)
+        print(f"serving on http://{self.host}:{self.port} ({self.pool} pool)", flush=True)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        async with server:
+            await stop.wait()
+        self.close()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"pool": self.pool, "requests": self.requests, "coalesced": self.coalesced,
+                "connections": self.connections, "inflight": len(self._inflight)}
+
+    # -------------------------
+    # Scoring: pool offload + request coalescing
+    # -------------------------
+
+    async def _run(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """fn(*args) in the pool; callers with the same key in flight share one result."""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, fn, *args)
+        self._inflight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    async def _query(self, params: Params) -> Any:
+        q = params.text("q")
+        cats = params.categories()
+        backend = params.get("backend", "index")
+        if backend not in BACKENDS:
+            raise HTTPError(400, f"'backend' must be one of {list(BACKENDS)}")
+        return await self._run(("query", tuple(tokenize(q)), cats, backend), run_query, q, cats, backend)
+
+    async def _batch(self, params: Params) -> Any:
+        queries = params.get("queries")
+        if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+            raise HTTPError(400, "'queries' must be a JSON list of strings")
+        if len(queries) > MAX_BATCH:
+            raise HTTPError(413, f"at most {MAX_BATCH} queries per batch")
+        cats = params.categories()
+        key = ("batch", tuple(tuple(tokenize(q)) for q in queries), cats)
+        return {"results": await self._run(key, run_batch, queries, cats)}
+
+    async def _topk(self, params: Params) -> Any:
+        q = params.text("q")
+        k = params.integer("k", 5, 1, MAX_K)
+        cats = params.categories()
+        return {"results": await self._run(("topk", tuple(tokenize(q)), k, cats), run_topk, q, k, cats)}
+
+    async def _faqs(self, params: Params) -> Any:
+        page = params.integer("page", 0, 0, 1 << 30)
+        page_size = params.integer("page_size", 10, 1, 1000)
+        cats = params.categories()
+        query = params.text("q", "")
+        key = ("faqs", page, page_size, cats, query)
+        return await self._run(key, run_faqs, page, page_size, cats, query)
+
+    async def _suggest(self, params: Params) -> Any:
+        # Tens of microseconds: answered on the event loop, a pool round
+        # trip would cost more than the lookup
+        q = params.text("q", "")
+        n = params.integer("n", 5, 1, MAX_SUGGESTIONS)
+        return {"suggestions": suggest(q, n)}
+
+    async def _metrics(self, params: Params) -> Any:
+        # Timings recorded by this process (thread pool); a process pool
+        # or pre-fork worker keeps its own.
+        if params.get("format", "prometheus") == "json":
+            return dict(METRICS.to_json(), server=self.stats())
+        return METRICS.to_prometheus()
+
+    # -------------------------
+    # HTTP/1.1 connection handling
+    # -------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "headers too large"}, False)
+                    break
+                keep_alive = await self._request(head, reader, writer)
+        except asyncio.CancelledError:
+            # Server shutting down with the connection still open: close it
+            # without waiting. The task ends normally, since asyncio's
+            # client-connected callback calls task.exception(), which
+            # raises on a cancelled task (Python < 3.12).
+            writer.close()
+        finally:
+            if not writer.is_closing():
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, asyncio.CancelledError):
+                    # Cancelled again while closing: the socket is closed
+                    # either way
+                    pass
+
+    async def _request(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Serve one request; returns whether the connection stays open."""
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ", 2)
+        except ValueError:
+            await self._respond(writer, 400, {"error": "malformed request line"}, False)
+            return False
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            await self._respond(writer, 400, {"error": "bad Content-Length"}, False)
+            return False
+        if length > MAX_BODY:
+            await self._respond(writer, 413, {"error": f"body larger than {MAX_BODY} bytes"}, False)
+            return False
+        try:
+            body = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            return False
+
+        self.requests += 1
+        try:
+            status, payload = 200, await self._dispatch(method, target, body)
+        except HTTPError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except Exception as exc:  # keep the connection and the server alive
+            status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+        await self._respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Any:
+        url = urlsplit(target)
+        route = self._routes.get(url.path.rstrip("/") or "/")
+        if route is None:
+            raise HTTPError(404, f"no such endpoint: {url.path}")
+        if method not in ("GET", "POST"):
+            raise HTTPError(405, "use GET or POST")
+        data: Dict[str, Any] = {}
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "body is not valid JSON") from None
+            if not isinstance(data, dict):
+                raise HTTPError(400, "body must be a JSON object")
+        return await route(Params(parse_qs(url.query), data))
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+# -------------------------
+# Pre-fork multi-process serving
+# - the parent compiles the knowledge base and index once (from a
+#   snapshot when DEANS_FAQ_KB points to one), freezes the GC and binds
+#   the listening socket, then forks the workers
+# - workers share the parent's index pages copy-on-write and accept on
+#   the inherited socket; each runs its own event loop, so scoring
+#   scales across cores instead of contending for one GIL
+# - the parent only supervises: a worker that dies is replaced, after a
+#   growing delay if it died soon after starting; after
+#   MAX_QUICK_FAILURES such deaths in a row (e.g. a bad snapshot or an
+#   import error) the parent stops every worker and exits
+# -------------------------
+
+# A worker exiting within this many seconds of its fork failed to start
+QUICK_FAILURE = 5.0
+MAX_QUICK_FAILURES = 5
+RESPAWN_DELAY = 0.1
+MAX_RESPAWN_DELAY = 5.0
+
+def serve_prefork(host: str, port: int, workers: int, pool_size: int = 1,
+                  reload: bool = False) -> None:
+    index = get_index()
+    # Objects that exist now are never collected: moving them out of the
+    # GC's generations keeps collections in the workers from writing to
+    # (and so un-sharing) the pages that hold the index.
+    gc.collect()
+    gc.freeze()
+    sock = socket.create_server((host, port), backlog=1024)
+    port = sock.getsockname()[1]
+    print(f"pre-fork: {len(index.entries)} entries, {workers} workers on http://{host}:{port}", flush=True)
+
+    # pid -> (slot, fork time)
+    children: Dict[int, Tuple[int, float]] = {}
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                if reload:
+                    from dean_reload import KnowledgeReloader
+                    KnowledgeReloader().start()
+                asyncio.run(FAQServer(host, port, "thread", pool_size).serve_forever(sock))
+            except KeyboardInterrupt:
+                pass
+            except SystemExit as exc:
+                status = 0 if not exc.code else 1
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(status)
+        children[pid] = (slot, time.monotonic())
+
+    stopping = False
+    failed = False
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(workers):
+        spawn(slot)
+    quick_failures = 0
+    while children:
+        try:
+            pid, wait_status = os.wait()
+        except ChildProcessError:
+            break
+        child = children.pop(pid, None)
+        if child is None or stopping:
+            continue
+        slot, started = child
+        # A clean exit or one asked for by a signal is not a failure
+        code = os.waitstatus_to_exitcode(wait_status)
+        crashed = code not in (0, -signal.SIGTERM, -signal.SIGINT)
+        if crashed and time.monotonic() - started < QUICK_FAILURE:
+            quick_failures += 1
+            if quick_failures >= MAX_QUICK_FAILURES:
+                print(f"pre-fork: {quick_failures} workers in a row died within {QUICK_FAILURE:.0f} s "
+                      "of starting; giving up", file=sys.stderr, flush=True)
+                stop(None, None)
+                failed = True
+                continue
+            time.sleep(min(RESPAWN_DELAY * 2 ** (quick_failures - 1), MAX_RESPAWN_DELAY))
+            if stopping:
+                continue
+        else:
+            quick_failures = 0
+        spawn(slot)
+    sock.close()
+    if failed:
+        raise SystemExit(1)
+
+# -------------------------
+# Command line
+# -------------------------
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Serve the FAQ engine as an HTTP JSON API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--pool", choices=("thread", "process"), default="thread")
+    ap.add_argument("--pool-size", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=0,
+                    help="pre-fork this many worker processes sharing one compiled index")
+    ap.add_argument("--reload", action="store_true",
+                    help="watch the knowledge base source and hot-reload it (thread pool only)")
+    ap.add_argument("--metrics", action="store_true", help="record stage timings, served at /metrics")
+    args = ap.parse_args(argv)
+
+    if args.reload and args.pool != "thread":
+        ap.error("--reload only swaps this process's index, not the process pool's; use the thread pool")
+    if args.metrics:
+        METRICS.enable()
+    if args.workers:
+        if args.pool != "thread":
+            ap.error("--workers already runs one process per worker; use the thread pool")
+        serve_prefork(args.host, args.port, args.workers, args.pool_size, args.reload)
+        return
+    server = FAQServer(args.host, args.port, args.pool, args.pool_size)
+    if args.reload:
+        from dean_reload import KnowledgeReloader
+        KnowledgeReloader().start()
+    asyncio.run(server.serve_forever())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# dean_store.py
+
+import argparse
+import csv
+import gc
+import json
+import marshal
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import dean_data
+from dean_data import EntryFeatures, FAQEntry, compile_knowledge_base
+
+# -------------------------
+# Externalized knowledge base
+# - JSON:  {"categories": [...], "synonyms": {...}, "entries": [...]} or a bare list of entries
+# - JSONL: one entry object per line; a line {"synonyms": {...}} adds synonyms
+# - CSV:   columns question, answer, keywords (separated by ";"), cat
+# - snapshot (.kbsnap): compiled binary form, see write_snapshot
+# An entry object has the FAQEntry fields: question, answer, keywords, cat.
+# -------------------------
+
+SNAPSHOT_MAGIC = b"DEANKB"
+SNAPSHOT_VERSION = 6
+SNAPSHOT_SUFFIX = ".kbsnap"
+CSV_KEYWORD_SEP = ";"
+
+@dataclass
+class LoadedKnowledgeBase:
+    entries: List[FAQEntry]
+    synonyms: Dict[str, List[str]]
+    categories: List[str]
+    # KnowledgeIndex.state() when loaded from a snapshot
+    index_state: Optional[tuple] = None
+
+def _entry(obj: dict) -> FAQEntry:
+    keywords = obj["keywords"]
+    if isinstance(keywords, str):
+        keywords = [k.strip() for k in keywords.split(CSV_KEYWORD_SEP) if k.strip()]
+    return FAQEntry(question=obj["question"], answer=obj["answer"], keywords=keywords, cat=obj["cat"])
+
+def _finish(entries: List[FAQEntry], synonyms: Optional[Dict[str, List[str]]],
+            categories: Optional[List[str]] = None) -> LoadedKnowledgeBase:
+    synonyms = dict(dean_data.SYNONYMS) if synonyms is None else synonyms
+    cats = list(categories or dean_data.CATEGORIES)
+    for f in entries:
+        if f.cat not in cats:
+            cats.append(f.cat)
+    compile_knowledge_base(entries, synonyms)
+    return LoadedKnowledgeBase(entries, synonyms, cats)
+
+def load_json(path: str) -> LoadedKnowledgeBase:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if isinstance(data, list):
+        return _finish([_entry(o) for o in data], None)
+    return _finish([_entry(o) for o in data["entries"]], data.get("synonyms"), data.get("categories"))
+
+def load_jsonl(path: str) -> LoadedKnowledgeBase:
+    entries: List[FAQEntry] = []
+    synonyms: Optional[Dict[str, List[str]]] = None
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if "synonyms" in obj:
+                synonyms = {**(synonyms or {}), **obj["synonyms"]}
+            else:
+                entries.append(_entry(obj))
+    return _finish(entries, synonyms)
+
+def load_csv(path: str) -> LoadedKnowledgeBase:
+    with open(path, encoding="utf-8", newline="") as fh:
+        return _finish([_entry(row) for row in csv.DictReader(fh)], None)
+
+def load_knowledge_base(path: str) -> LoadedKnowledgeBase:
+    """Load a knowledge base file, picking the format from its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    loaders = {".json": load_json, ".jsonl": load_jsonl, ".csv": load_csv, SNAPSHOT_SUFFIX: read_snapshot}
+    if ext not in loaders:
+        raise ValueError(f"Unsupported knowledge base format: {path}")
+    return loaders[ext](path)
+
+def save_json(path: str, entries: Iterable[FAQEntry], synonyms: Dict[str, List[str]],
+              categories: List[str]) -> None:
+    """Write entries + synonyms in the JSON format read by load_json."""
+    data = {
+        "categories": list(categories),
+        "synonyms": synonyms,
+        "entries": [
+            {"question": f.question, "answer": f.answer, "keywords": list(f.keywords), "cat": f.cat}
+            for f in entries
+        ],
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False, indent=2)
+
+# -------------------------
+# Binary snapshot
+# - header: SNAPSHOT_MAGIC + 1 version byte
+# - body: marshal of plain Python data (entries with their compiled
+#   features, synonyms, categories and KnowledgeIndex.state()); the
+#   typo index in that state records the fuzzy distance it was built
+#   for and is rebuilt at load if the current setting differs
+# The file is mapped with mmap and decoded in one marshal call: nothing
+# is re-tokenized or re-indexed at load.
+# -------------------------
+
+def write_snapshot(path: str, entries: List[FAQEntry], synonyms: Dict[str, List[str]],
+                   categories: List[str]) -> None:
+    from dean_index import KnowledgeIndex
+
+    compile_knowledge_base(entries, synonyms)
+    index = KnowledgeIndex(entries, synonyms)
+    body = {
+        "categories": list(categories),
+        "synonyms": {k: list(v) for k, v in synonyms.items()},
+        "entries": [
+            (f.question, f.answer, tuple(f.keywords), f.cat,
+             f.features.keywords, f.features.question_tokens, f.features.synonyms, f.features.phrases)
+            for f in entries
+        ],
+        "index": index.state(),
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(SNAPSHOT_MAGIC + bytes([SNAPSHOT_VERSION]))
+        marshal.dump(body, fh)
+    os.replace(tmp, path)
+
+def read_snapshot(path: str) -> LoadedKnowledgeBase:
+    # Everything loaded here is long-lived: pausing the cyclic GC avoids
+    # repeated collections while the object graph is being built.
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _read_snapshot(path)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+def _read_snapshot(path: str) -> LoadedKnowledgeBase:
+    header = len(SNAPSHOT_MAGIC) + 1
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            raise ValueError(f"Not a knowledge base snapshot: {path}")
+        if mm[len(SNAPSHOT_MAGIC)] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {mm[len(SNAPSHOT_MAGIC)]}: {path}")
+        with memoryview(mm) as view:
+            body = marshal.loads(view[header:])
+
+    entries: List[FAQEntry] = []
+    for question, answer, keywords, cat, kws, q_tokens, syns, phrases in body["entries"]:
+        features = EntryFeatures(kws, q_tokens, syns, phrases)
+        entries.append(FAQEntry(question=question, answer=answer, keywords=keywords, cat=cat, features=features))
+    return LoadedKnowledgeBase(entries, body["synonyms"], body["categories"], body["index"])
+
+# -------------------------
+# Command line
+# -------------------------
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Convert and compile knowledge base files.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export", help="write the built-in knowledge base as JSON")
+    p.add_argument("out")
+    p = sub.add_parser("snapshot", help="compile a knowledge base file into a snapshot")
+    p.add_argument("source", help="JSON/JSONL/CSV file, or 'builtin' for dean_data")
+    p.add_argument("out")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "export":
+        save_json(args.out, dean_data.KNOWLEDGE_BASE, dean_data.SYNONYMS, dean_data.CATEGORIES)
+    elif args.source == "builtin":
+        write_snapshot(args.out, dean_data.KNOWLEDGE_BASE, dean_data.SYNONYMS, dean_data.CATEGORIES)
+    else:
+        kb = load_knowledge_base(args.source)
+        write_snapshot(args.out, kb.entries, kb.synonyms, kb.categories)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# dean_suggest.py
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, Iterable, List, Sequence, Tuple
+from dean_data import FAQEntry
+
+# -------------------------
+# Type-ahead suggestions
+# - completions: every FAQ question, keyword and synonym (lowercased,
+#   whitespace collapsed), ranked by weight:
+#   question 3, keyword 3 per entry listing it, synonym 2 per entry
+#   listing one of its keywords; then shorter first, then alphabetical
+# - compressed prefix trie (radix tree): one node per branching point,
+#   each edge labelled with a whole run of characters
+# - every node stores its TOP_N best completions, so a lookup walks
+#   len(prefix) characters and copies at most TOP_N ids
+# - the trie is frozen into flat arrays (no per-node objects)
+# -------------------------
+
+TOP_N = 8
+QUESTION, KEYWORD, SYNONYM = 0, 1, 2
+QUESTION_WEIGHT = 3
+
+def normalize(text: str) -> str:
+    """Lookup key of a completion or typed prefix."""
+    return " ".join(text.lower().split())
+
+class SuggestionTrie:
+    """
+    Ranked completions of a typed prefix. Completion ids are ranks
+    (0 = best), so a node's top completions are the smallest ids below it.
+
+    Node i (breadth-first order, root = 0) is stored as:
+    - _labels[_label_start[i]:+_label_len[i]]: its edge label
+    - _first[i]: first character of that label
+    - _child_start[i], _child_count[i]: its children, contiguous and sorted
+    - _tops[_top_start[i]:+_top_len[i]]: its best completion ids
+    """
+
+    def __init__(self, completions: Iterable[Tuple[str, str, int, int]]):
+        """completions: (key, display text, kind, weight); repeated keys add up."""
+        merged: Dict[str, List] = {}
+        for key, text, kind, weight in completions:
+            if not key:
+                continue
+            item = merged.get(key)
+            if item is None:
+                merged[key] = [text, kind, weight]
+            else:
+                item[2] += weight
+                if kind < item[1]:  # questions first, then keywords
+                    item[0], item[1] = text, kind
+        ranked = sorted(merged, key=lambda k: (-merged[k][2], len(k), k))
+        self.texts: List[str] = [merged[k][0] for k in ranked]
+        self.kinds = array("B", (merged[k][1] for k in ranked))
+        self._build(sorted(ranked), {k: i for i, k in enumerate(ranked)})
+        # Set by dean_logic.get_suggester to the index generation it covers
+        self.generation = 0
+
+    @classmethod
+    def from_entries(cls, entries: Sequence[FAQEntry], synonym_sets: Dict[str, Iterable[str]]) -> "SuggestionTrie":
+        """Completions of a knowledge base: its questions, keywords and their synonyms."""
+        listed: Dict[str, int] = {}
+        completions: List[Tuple[str, str, int, int]] = []
+        for f in entries:
+            completions.append((normalize(f.question), f.question, QUESTION, QUESTION_WEIGHT))
+            for kw in f.keywords:
+                kw = kw.lower()
+                listed[kw] = listed.get(kw, 0) + 1
+        for kw, n in listed.items():
+            completions.append((normalize(kw), kw, KEYWORD, 3 * n))
+            for syn in synonym_sets.get(kw, ()):
+                completions.append((normalize(syn), syn, SYNONYM, 2 * n))
+        return cls(completions)
+
+    # -------------------------
+    # Construction
+    # -------------------------
+
+    def _build(self, keys: List[str], ids: Dict[str, int]) -> None:
+        # Temporary nodes: [label, completion id or -1, children, top ids]
+        def node(lo: int, hi: int, depth: int, label: str) -> list:
+            own = -1
+            if len(keys[lo]) == depth:  # a key ending here sorts first
+                own = ids[keys[lo]]
+                lo += 1
+            children = []
+            while lo < hi:
+                # Keys lo..hi share keys[lo][:depth]: the group of the next
+                # character ends before that prefix + the following character
+                key = keys[lo]
+                end = bisect_left(keys, key[:depth] + chr(ord(key[depth]) + 1), lo, hi)
+                # Sorted keys: the common prefix of the first and last is shared by all
+                first, last = keys[lo], keys[end - 1]
+                stop = depth + 1
+                while stop < len(first) and stop < len(last) and first[stop] == last[stop]:
+                    stop += 1
+                children.append(node(lo, end, stop, first[depth:stop]))
+                lo = end
+            top = sorted([i for ch in children for i in ch[3]] + ([own] if own >= 0 else []))
+            return [label, own, children, top[:TOP_N]]
+
+        root = node(0, len(keys), 0, "") if keys else ["", -1, [], []]
+
+        label_start, label_len = array("I"), array("I")
+        child_start, child_count = array("I"), array("I")
+        top_start, top_len, tops = array("I"), array("I"), array("I")
+        labels: List[str] = []
+        first: List[str] = []
+        offset = 0
+        queue = deque([root])
+        next_id = 1
+        while queue:
+            label, _, children, top = queue.popleft()
+            label_start.append(offset)
+            label_len.append(len(label))
+            labels.append(label)
+            offset += len(label)
+            first.append(label[:1] or " ")
+            child_start.append(next_id)
+            child_count.append(len(children))
+            next_id += len(children)
+            queue.extend(children)
+            top_start.append(len(tops))
+            top_len.append(len(top))
+            tops.extend(top)
+
+        self._labels = "".join(labels)
+        self._first = "".join(first)
+        self._label_start, self._label_len = label_start, label_len
+        self._child_start, self._child_count = child_start, child_count
+        self._top_start, self._top_len, self._tops = top_start, top_len, tops
+
+    # -------------------------
+    # Lookup
+    # -------------------------
+
+    def complete(self, prefix: str) -> Sequence[int]:
+        """Ids (best first, at most TOP_N) of the completions of a normalized prefix."""
+        labels, first = self._labels, self._first
+        node, i, n = 0, 0, len(prefix)
+        while i < n:
+            start = self._child_start[node]
+            node = first.find(prefix[i], start, start + self._child_count[node])
+            if node < 0:
+                return ()
+            ls = self._label_start[node]
+            m = min(self._label_len[node], n - i)
+            if not labels.startswith(prefix[i:i + m], ls):
+                return ()
+            i += m
+        start = self._top_start[node]
+        return self._tops[start:start + self._top_len[node]]
+
+    def suggest(self, text: str, n: int = 5) -> List[str]:
+        """
+        Up to n suggestions for partially typed text:
+        - completions of the whole text (questions, keywords, synonyms)
+        - then the text with its last word completed by a keyword or synonym
+        """
+        key = normalize(text)
+        if not key:
+            return []
+        out = [self.texts[i] for i in self.complete(key)[:n]]
+        if len(out) < n and " " in key:
+            head, last = key.rsplit(" ", 1)
+            for i in self.complete(last):
+                if self.kinds[i] != QUESTION:
+                    s = f"{head} {self.texts[i]}"
+                    if s not in out:
+                        out.append(s)
+                        if len(out) == n:
+                            break
+        return out
+
+    # -------------------------
+    # Size
+    # -------------------------
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nodes(self) -> int:
+        return len(self._label_start)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the trie itself (arrays and labels, not the completion texts)."""
+        parts = (self._labels, self._first, self.kinds, self._label_start, self._label_len,
+                 self._child_start, self._child_count, self._top_start, self._top_len, self._tops)
+        return sum(sys.getsizeof(p) for p in parts) + sys.getsizeof(self.texts)
@@ -0,0 +1,131 @@
+# faq_thy.py
+
+import argparse
+import re
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import dean_data
+from dean_data import FAQEntry, compile_knowledge_base
+from dean_store import write_snapshot
+
+# -------------------------
+# Build-time generator: FAQ.thy -> compiled knowledge base snapshot
+# - parses `datatype category`, `synonym_map` and every
+#   `definition <name> :: "faq_entry list"` (record literals or `@` joins)
+# - knowledge_base is the list production loads
+# - diffs the result against dean_data.KNOWLEDGE_BASE / SYNONYMS
+# -------------------------
+
+_DEFINITION = re.compile(
+    r'^definition\s+(\w+)\s*::\s*"([^"]*)"\s*where\s*\n"\1\s*=(.*?)"\s*$',
+    re.MULTILINE | re.DOTALL,
+)
+_CATEGORIES = re.compile(r"^datatype\s+category\s*=(.*?)\n\s*\n", re.MULTILINE | re.DOTALL)
+_RECORD = re.compile(r"\(\|(.*?)\|\)", re.DOTALL)
+_TEXT_FIELD = r"^\s*{}\s*=\s*''(.*)'',?\s*$"
+_STRING = re.compile(r"''(.*?)''")
+_SYNONYM_ROW = re.compile(r"\(\s*''(.*?)''\s*,\s*\[(.*?)\]\s*\)")
+
+def _text(field: str, record: str) -> str:
+    m = re.search(_TEXT_FIELD.format(field), record, re.MULTILINE)
+    if m is None:
+        raise ValueError(f"record without {field}: {record.strip()[:60]}")
+    # FAQ.thy writes an apostrophe inside a string as ''
+    return m.group(1).replace("''", "'")
+
+def _parse_records(body: str) -> List[FAQEntry]:
+    entries = []
+    for rec in _RECORD.findall(body):
+        kw_match = re.search(r"keywords\s*=\s*\[(.*?)\]", rec, re.DOTALL)
+        cat_match = re.search(r"cat\s*=\s*(\w+)", rec)
+        if kw_match is None or cat_match is None:
+            raise ValueError(f"incomplete record: {rec.strip()[:60]}")
+        entries.append(FAQEntry(
+            question=_text("question", rec),
+            answer=_text("answer", rec),
+            keywords=_STRING.findall(kw_match.group(1)),
+            cat=cat_match.group(1),
+        ))
+    return entries
+
+def parse_thy(text: str) -> Tuple[List[FAQEntry], Dict[str, List[str]], List[str]]:
+    """Return (knowledge_base, synonym_map, categories) as defined in a theory file."""
+    definitions = {name: (typ, body) for name, typ, body in _DEFINITION.findall(text)}
+
+    m = _CATEGORIES.search(text)
+    categories = [c.strip() for c in m.group(1).split("|")] if m else list(dean_data.CATEGORIES)
+
+    synonyms: Dict[str, List[str]] = {}
+    if "synonym_map" in definitions:
+        for kw, syns in _SYNONYM_ROW.findall(definitions["synonym_map"][1]):
+            synonyms[kw] = _STRING.findall(syns)
+
+    lists: Dict[str, List[FAQEntry]] = {}
+
+    def resolve(name: str) -> List[FAQEntry]:
+        if name not in lists:
+            typ, body = definitions[name]
+            if typ.strip() != "faq_entry list":
+                raise ValueError(f"{name} is not a faq_entry list")
+            if "(|" in body:
+                lists[name] = _parse_records(body)
+            else:
+                lists[name] = [f for part in body.split("@") for f in resolve(part.strip())]
+        return lists[name]
+
+    return resolve("knowledge_base"), synonyms, categories
+
+# -------------------------
+# Drift report against dean_data
+# -------------------------
+
+def diff_knowledge_base(entries: List[FAQEntry], synonyms: Dict[str, List[str]],
+                        ref_entries: Optional[List[FAQEntry]] = None,
+                        ref_synonyms: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """Human-readable differences (empty list = identical)."""
+    ref_entries = dean_data.KNOWLEDGE_BASE if ref_entries is None else ref_entries
+    ref_synonyms = dean_data.SYNONYMS if ref_synonyms is None else ref_synonyms
+    problems: List[str] = []
+    if len(entries) != len(ref_entries):
+        problems.append(f"entry count: FAQ.thy has {len(entries)}, dean_data has {len(ref_entries)}")
+    for i, (a, b) in enumerate(zip(entries, ref_entries)):
+        for field in ("question", "answer", "cat"):
+            if getattr(a, field) != getattr(b, field):
+                problems.append(f"entry {i} {field}: {getattr(a, field)!r} != {getattr(b, field)!r}")
+        if list(a.keywords) != list(b.keywords):
+            problems.append(f"entry {i} keywords: {list(a.keywords)} != {list(b.keywords)}")
+    for kw in sorted(set(synonyms) | set(ref_synonyms)):
+        if list(synonyms.get(kw, [])) != list(ref_synonyms.get(kw, [])):
+            problems.append(f"synonyms[{kw!r}]: {synonyms.get(kw)} != {ref_synonyms.get(kw)}")
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Compile FAQ.thy into a knowledge base snapshot.")
+    ap.add_argument("thy", nargs="?", default="FAQ.thy")
+    ap.add_argument("-o", "--out", help="snapshot to write (e.g. kb.kbsnap)")
+    ap.add_argument("--no-diff", action="store_true", help="skip the comparison with dean_data")
+    args = ap.parse_args(argv)
+
+    with open(args.thy, encoding="utf-8") as fh:
+        entries, synonyms, categories = parse_thy(fh.read())
+    compile_knowledge_base(entries, synonyms)
+    print(f"{args.thy}: {len(entries)} entries, {len(synonyms)} synonym groups")
+
+    status = 0
+    if not args.no_diff:
+        problems = diff_knowledge_base(entries, synonyms)
+        for p in problems:
+            print("MISMATCH", p)
+        if problems:
+            status = 1
+        else:
+            print("matches dean_data")
+
+    if args.out:
+        write_snapshot(args.out, entries, synonyms, categories)
+        print(f"wrote {args.out}")
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())